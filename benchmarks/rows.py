@@ -0,0 +1,104 @@
+"""Time and memory of collecting a test over a large sweep of rows.
+
+Compares a list of row dicts with formatted ids, the way a sweep had to be
+spelled before, to handing ``@fixture`` the columns (or an array) directly.
+Each spelling goes through ``we_love_fixture.fixture`` and is collected by
+``pytest --collect-only`` in a fresh interpreter, so pytest's own item per row
+is part of the numbers.
+
+Run with ``python benchmarks/rows.py [ROWS]``.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, Tuple
+
+# runs in the child, reports seconds and peak RSS in KiB (bytes on macOS)
+COLLECT = """
+import resource, sys, time
+import pytest
+
+start = time.perf_counter()
+code = pytest.main(["--collect-only", "-qq", "-p", "no:cacheprovider", sys.argv[1]])
+elapsed = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(code, elapsed, peak, file=sys.stderr)
+"""
+
+LISTED = """
+from we_love_fixture import fixture
+
+params = [{{"x": x, "y": x / 2}} for x in range({n})]
+ids = [f"{{row['x']}}-{{row['y']}}" for row in params]
+point = fixture(autoparam=True, params=params, ids=ids)
+
+
+def test_point(point):
+    pass
+"""
+
+COLUMNS = """
+from we_love_fixture import fixture
+
+columns = {{"x": range({n}), "y": [x / 2 for x in range({n})]}}
+point = fixture(autoparam=True, params=columns)
+
+
+def test_point(point):
+    pass
+"""
+
+ARRAY = """
+import numpy as np
+
+from we_love_fixture import fixture
+
+array = np.arange({n} * 2).reshape({n}, 2)
+point = fixture(autoparam=True, params=array)
+
+
+def test_point(point):
+    pass
+"""
+
+
+def collect(directory: Path, name: str, source: str) -> Tuple[float, float]:
+    path = directory / f"test_{name}.py"
+    path.write_text(source)
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", COLLECT, str(path)],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+        cwd=directory,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)},
+    )
+    code, elapsed, peak = result.stderr.split()[-3:]
+    if code != "0":
+        raise RuntimeError(f"collecting {path} failed with exit code {code}")
+    scale = 2**20 if sys.platform == "darwin" else 2**10
+    return float(elapsed), int(peak) / scale
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    cases: List[Tuple[str, str]] = [("list of dicts", LISTED), ("column dict", COLUMNS)]
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("numpy is not installed, skipping the array case")
+    else:
+        cases.append(("numpy array", ARRAY))
+
+    print(f"{n:,} rows")
+    with tempfile.TemporaryDirectory() as tmp:
+        for i, (name, source) in enumerate(cases):
+            elapsed, peak = collect(Path(tmp), str(i), source.format(n=n))
+            print(f"{name:>15}: {elapsed:6.2f}s {peak:8.1f}MiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+"""Load the plugin for the test suite, it is not installed as an entry point here."""
+pytest_plugins = ["pytester", "we_love_fixture.plugin"]
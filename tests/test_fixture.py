@@ -1,10 +1,14 @@
+import importlib
+import sys
 from inspect import signature
 from typing import List
 
 import pytest
 from _pytest.fixtures import SubRequest
+from _pytest.pytester import Pytester
 
 from we_love_fixture import fixture
+from we_love_fixture.cache import WrapperCache
 
 
 # test a normal fixture
@@ -110,3 +114,38 @@ class TestFixtures:
     def test_that_self_is_filled_in_correctly(self, self_test: "TestFixtures"):
         assert isinstance(self, TestFixtures)
         assert isinstance(self_test, TestFixtures)
+
+
+def test_wrapper_cache(pytester: Pytester, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(sys, "dont_write_bytecode", False)
+    pytester.syspathinsert()
+    pytester.makepyfile(
+        cached="""
+        from we_love_fixture import fixture
+
+        @fixture
+        def b(a, request, c: str, d: int = 1):
+            return a + c * d
+        """
+    )
+
+    def load():
+        monkeypatch.setattr(WrapperCache, "_modules", {})
+        sys.modules.pop("cached", None)
+        return importlib.import_module("cached"), WrapperCache._modules["cached"]
+
+    cold, cache = load()
+    assert (cache.hits, cache.misses) == (0, 2)
+    WrapperCache.flush_all()
+    assert (
+        pytester.path / "__pycache__" / f"cached.{sys.implementation.cache_tag}.wlf"
+    ).exists()
+
+    warm, cache = load()
+    assert (cache.hits, cache.misses) == (2, 0)
+    assert signature(warm.b) == signature(cold.b)
+    assert signature(warm.b.mark) == signature(cold.b.mark)
+    # pytest wraps the generated function to error out when called directly
+    warm_call, cold_call = warm.b.__wrapped__, cold.b.__wrapped__
+    assert warm_call.__defaults__ == cold_call.__defaults__ == (1,)
+    assert warm_call.__code__.co_varnames == cold_call.__code__.co_varnames
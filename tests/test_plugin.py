@@ -0,0 +1,895 @@
+"""Tests for the we_love_fixture pytest plugin."""
+import json
+import operator
+import os
+import pstats
+import time
+from pathlib import Path
+
+import pytest
+from _pytest.pytester import Pytester, RunResult
+
+from we_love_fixture.baseline import percentile
+from we_love_fixture.batch import make_batches
+from we_love_fixture.daemon import DaemonClient, socket_path
+from we_love_fixture.graph import ItemGraph
+from we_love_fixture.lazy import LazyProxy, is_built
+from we_love_fixture.params import Rows, dedupe_params
+
+
+def run(pytester: Pytester, *args: str) -> RunResult:
+    return pytester.runpytest("-p", "we_love_fixture.plugin", *args)
+
+
+@pytest.fixture
+def chain(pytester: Pytester) -> Pytester:
+    pytester.makepyfile(
+        """
+        import time
+
+        import pytest
+
+        from we_love_fixture import fixture
+
+
+        @pytest.fixture
+        def a():
+            time.sleep(0.02)
+            return "a"
+
+
+        @pytest.fixture(scope="module")
+        def c():
+            time.sleep(0.01)
+            return "c"
+
+
+        @fixture
+        def b(a, request, c, d: int = 1):
+            return f"{a}, {c}" * d
+
+
+        def test_b(b):
+            assert b == "a, c"
+
+
+        @b.mark(d=2)
+        def test_b2(b, c):
+            assert b == "a, ca, c"
+        """
+    )
+    return pytester
+
+
+def test_critical_path() -> None:
+    test = ItemGraph("test_x", roots=["b"])
+    test.add("b", ["a", "c"])
+    test.add("a", ["e"])
+    test.durations.update({"a": 1.0, "b": 0.5, "c": 2.0, "e": 0.25})
+    assert test.critical_path() == (["b", "c"], 2.5)
+
+
+def test_graph_export(chain: Pytester) -> None:
+    result = run(chain, "--wlf-graph=graph.json", "--wlf-graph-dot=graph.dot")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(["*we love fixture timing*", "*critical path*b -> a"])
+
+    graph = json.loads((chain.path / "graph.json").read_text())
+    assert graph["fixtures"]["b"]["we_love_fixture"] is True
+    assert graph["fixtures"]["c"]["setups"] == 1
+    assert graph["fixtures"]["a"]["setups"] == 2
+
+    test_b2 = graph["tests"]["test_graph_export.py::test_b2"]
+    assert test_b2["roots"] == ["b", "c"]
+    assert test_b2["edges"]["b"] == ["a", "c"]
+    # c is module scoped and was already set up by test_b
+    assert "c" not in test_b2["durations"]
+    assert test_b2["critical_path"]["path"] == ["b", "a"]
+
+    dot = (chain.path / "graph.dot").read_text()
+    assert dot.startswith("digraph fixtures {")
+    assert '"b" -> "a" [style=bold, color=red];' in dot
+    assert '"b" -> "c";' in dot
+
+
+def test_snapshot(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        import pytest
+
+        from we_love_fixture import fixture
+
+        builds = []
+
+
+        @fixture(snapshot=True)
+        def store(size: int = 3):
+            builds.append(size)
+            return {"rows": list(range(size))}
+
+
+        @pytest.mark.parametrize("i", range(3))
+        def test_mutate(store, i):
+            assert store["rows"] == [0, 1, 2]
+            store["rows"].append(i)
+
+
+        @store.mark(size=1)
+        def test_variant(store):
+            store["rows"].clear()
+
+
+        @store.mark(size=1)
+        def test_variant_again(store):
+            assert store["rows"] == [0]
+
+
+        def test_built_once_per_variant():
+            assert builds == [3, 1]
+        """
+    )
+    result = run(pytester)
+    result.assert_outcomes(passed=6)
+    result.stdout.fnmatch_lines(
+        [
+            "*we love fixture snapshots*",
+            "*::store[[]]: built in *, 3x * restore *faster than a rebuild*",
+            "*::store[[]size=1]: built in *, 2x * restore *faster than a rebuild*",
+        ]
+    )
+
+
+def test_snapshot_validation() -> None:
+    from we_love_fixture import fixture
+
+    with pytest.raises(TypeError, match="generator"):
+
+        @fixture(snapshot=True)
+        def store():
+            yield {}
+
+    with pytest.raises(TypeError, match="requests tmp_path"):
+
+        @fixture(snapshot=True)
+        def other(request, tmp_path):
+            return {}
+
+
+def test_callable_ids(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        from we_love_fixture import fixture
+
+
+        @fixture(params=[1, 2], ids=lambda p: f"p{p}")
+        def n(request):
+            return request.param
+
+
+        def test_n(n):
+            assert n in (1, 2)
+        """
+    )
+    result = run(pytester, "-v")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(["*test_n?p1? PASSED*", "*test_n?p2? PASSED*"])
+
+
+def test_lazy(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        import pytest
+
+        from we_love_fixture import fixture
+
+        events = []
+
+
+        @fixture(lazy=True)
+        def conn(name: str = "db"):
+            events.append(f"open {name}")
+            yield {"name": name}
+            events.append(f"close {name}")
+
+
+        def test_untouched(conn):
+            assert events == []
+
+
+        @conn.mark(name="other")
+        def test_used(conn):
+            assert conn["name"] == "other"
+            assert isinstance(conn, dict)
+            assert events == ["open other"]
+
+
+        def test_events():
+            assert events == ["open other", "close other"]
+        """
+    )
+    result = run(pytester, "--wlf-timing")
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines(["*::conn: 1 lazy avoided, 1 lazy built"])
+
+
+def test_lazy_proxy() -> None:
+    built = []
+    proxy = LazyProxy(lambda: built.append(1) or [1, 2])
+    assert repr(proxy).startswith("<LazyProxy of ")
+    assert not is_built(proxy) and not built
+    assert proxy == [1, 2]
+    assert is_built(proxy) and built == [1]
+    assert len(proxy) == 2 and proxy + [3] == [1, 2, 3] and [0] + proxy == [0, 1, 2]
+    assert isinstance(proxy, list)
+    assert built == [1]
+
+    value = [1]
+    proxy = LazyProxy(lambda: value)
+    alias = proxy
+    alias += [2]
+    assert alias is proxy and value == [1, 2]
+    counter = LazyProxy(lambda: 1)
+    counter += 1
+    assert counter == 2 and type(counter) is LazyProxy
+    assert round(LazyProxy(lambda: 1.26), 1) == 1.3
+    assert complex(LazyProxy(lambda: 1)) == 1 + 0j
+    assert next(LazyProxy(lambda: iter("ab"))) == "a"
+    assert operator.length_hint(LazyProxy(lambda: [1, 2])) == 2
+
+
+def test_lazy_proxy_path(tmp_path: Path) -> None:
+    (tmp_path / "data.txt").write_text("hi")
+    proxy = LazyProxy(lambda: tmp_path / "data.txt")
+    assert os.fspath(proxy) == str(tmp_path / "data.txt")
+    with open(proxy) as f:
+        assert f.read() == "hi"
+
+
+def test_profile(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        import pytest
+
+        from we_love_fixture import fixture
+
+        leak = []
+
+
+        @fixture
+        def leaky():
+            leak.append(bytearray(100_000))
+            yield
+            leak.append(bytearray(10_000))
+
+
+        @fixture(profile=True)
+        def flagged():
+            return list(range(1000))
+
+
+        @fixture
+        def ignored():
+            return None
+
+
+        cache = {}
+
+
+        @fixture(profile=True)
+        def warm():
+            if not cache:
+                cache["data"] = bytearray(500_000)
+            return cache["data"]
+
+
+        @pytest.mark.parametrize("i", range(3))
+        def test_many(leaky, flagged, ignored, warm, i):
+            pass
+        """
+    )
+    result = run(pytester, "--wlf-profile=leak*", "--wlf-profile-dir=prof")
+    result.assert_outcomes(passed=3)
+    result.stdout.fnmatch_lines(
+        [
+            "*we love fixture profiles*",
+            "test_profile.flagged: 3x, *ms",
+            "test_profile.leaky: 3x, *ms",
+            "  setup *KiB  *test_profile.py:10",
+            "  teardown *KiB  *test_profile.py:12",
+            "  retained *KiB  *test_profile.py:10",
+        ]
+    )
+    # leaky's leak is not blamed on flagged, which ran next to it
+    flagged = result.stdout.str().split("test_profile.flagged:")[1]
+    assert "test_profile.py:10" not in flagged.split("test_profile.leaky:")[0]
+    # filling a cache once is not a leak
+    warm = result.stdout.str().split("test_profile.warm:")[1]
+    assert "retained" not in warm.split("pstats and allocations")[0]
+    files = sorted(p.name for p in (pytester.path / "prof").iterdir())
+    assert files == [
+        "allocations.txt",
+        "test_profile.flagged.pstats",
+        "test_profile.leaky.pstats",
+        "test_profile.warm.pstats",
+    ]
+    pstats.Stats(str(pytester.path / "prof" / "test_profile.leaky.pstats"))
+
+
+def test_profile_autoparam(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        from we_love_fixture import fixture
+
+        c = fixture(autoparam=True, one=1)
+        d = fixture(autoparam=True, two=2)
+
+
+        def test_cd(c, d):
+            pass
+        """
+    )
+    result = run(pytester, "--wlf-profile=*", "--wlf-profile-dir=prof")
+    result.stdout.fnmatch_lines(
+        ["test_profile_autoparam.c: 1x, *ms", "test_profile_autoparam.d: 1x, *ms"]
+    )
+
+
+@pytest.fixture
+def slow(pytester: Pytester) -> Pytester:
+    pytester.makepyfile(
+        """
+        import time
+
+        from we_love_fixture import fixture
+
+
+        # only the over budget phases sleep, the others finish far below it
+        @fixture(budget_ms=15)
+        def slow():
+            time.sleep(0.02)
+            yield
+
+
+        @fixture(budget_ms=15)
+        def slow_teardown():
+            yield
+            time.sleep(0.02)
+
+
+        def test_slow(slow):
+            pass
+
+
+        def test_slow_teardown(slow_teardown):
+            pass
+        """
+    )
+    return pytester
+
+
+def test_budget_warns(slow: Pytester) -> None:
+    result = run(slow)
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(
+        [
+            "*FixtureBudgetWarning: fixture 'slow' setup took *ms, "
+            "over its budget of 15ms",
+            "*FixtureBudgetWarning: fixture 'slow_teardown' teardown took *ms, "
+            "over its budget of 15ms",
+        ]
+    )
+    result.stdout.no_fnmatch_line("*fixture 'slow' teardown took*")
+
+
+def test_budget_fails(slow: Pytester) -> None:
+    result = run(slow, "--wlf-budget-action=fail")
+    result.assert_outcomes(passed=1, errors=2)
+    result.stdout.fnmatch_lines(
+        [
+            "*ERROR at setup of test_slow*",
+            "*fixture 'slow' setup took *ms, over its budget*",
+            "*ERROR at teardown of test_slow_teardown*",
+            "*fixture 'slow_teardown' teardown took *ms, over its budget*",
+        ]
+    )
+
+
+def test_baseline(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        import time
+
+        from we_love_fixture import fixture
+
+
+        @fixture
+        def slow():
+            time.sleep(0.02)
+            yield
+            time.sleep(0.01)
+
+
+        def test_slow(slow):
+            pass
+        """
+    )
+    baseline = pytester.path / "baseline.json"
+    result = run(pytester, "--wlf-baseline=baseline.json")
+    result.assert_outcomes(passed=1)
+    recorded = json.loads(baseline.read_text())["fixtures"]["slow"]
+    assert recorded["setup"]["n"] == 1
+    assert 0.02 <= recorded["setup"]["p50"] < 1
+    assert 0.01 <= recorded["teardown"]["p95"] < 1
+
+    recorded["setup"].update(p50=0.001, p95=0.001)
+    baseline.write_text(json.dumps({"fixtures": {"slow": recorded}}))
+    result = run(pytester, "--wlf-baseline=baseline.json", "--wlf-budget-action=fail")
+    # the test itself passed, only the regression fails the run
+    result.assert_outcomes(passed=1)
+    assert result.ret == 1
+    result.stdout.fnmatch_lines(
+        [
+            "REGRESSION slow setup p50 1.00ms -> *ms (*x)",
+            "REGRESSION slow setup p95 1.00ms -> *ms (*x)",
+        ]
+    )
+
+    result = run(pytester, "--wlf-baseline=baseline.json", "--wlf-baseline-update")
+    assert result.ret == 0
+    updated = json.loads(baseline.read_text())["fixtures"]["slow"]
+    assert updated["setup"]["p50"] >= 0.02
+
+
+def test_percentile() -> None:
+    assert percentile([], 50) == 0.0
+    assert percentile([3.0, 1.0, 2.0], 50) == 2.0
+    assert percentile(list(range(1, 101)), 95) == 95
+
+
+def test_batch(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        import pytest
+
+        from we_love_fixture import fixture
+
+        setups = []
+
+
+        @pytest.fixture
+        def dep():
+            setups.append(1)
+
+
+        c = fixture(autoparam=True, batch=2, one=1, two=2, three=3, four=4, five=5)
+
+
+        def test_c(c, dep):
+            if c == 4:
+                pytest.skip("four")
+            assert c != 3
+
+
+        def test_setups():
+            assert len(setups) == 3
+        """
+    )
+    result = run(pytester, "-v")
+    result.assert_outcomes(passed=4, failed=1, skipped=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*::test_c[[]one] PASSED*",
+            "*::test_c[[]two] PASSED*",
+            "*::test_c[[]three] FAILED*",
+            "*::test_c[[]four] SKIPPED*",
+            "*::test_c[[]five] PASSED*",
+            "*::test_setups PASSED*",
+        ]
+    )
+    assert "test_c[one..two] PASSED" not in result.stdout.str()
+
+
+def test_batch_reports_through_hooks(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        import pytest
+
+        from we_love_fixture import fixture
+
+        c = fixture(autoparam=True, batch=3, one=1, two=2, three=3)
+
+
+        @pytest.fixture
+        def doubled(c):
+            return c * 2
+
+
+        @pytest.mark.xfail
+        def test_marked(c):
+            assert c == 1
+
+
+        def test_imperative(c):
+            if c == 2:
+                pytest.xfail("two")
+
+
+        def test_dependent(doubled):
+            pass
+        """
+    )
+    result = run(pytester, "-v", "-rX")
+    result.assert_outcomes(passed=2, xfailed=3, xpassed=1, errors=1)
+    result.stdout.fnmatch_lines(
+        [
+            "*::test_marked[[]one] XPASS*",
+            "*::test_marked[[]two] XFAIL*",
+            "*::test_marked[[]three] XFAIL*",
+            "*::test_imperative[[]two] XFAIL*",
+            "*fixture 'doubled' requests 'c', batch=N fixtures can only be "
+            "requested by tests",
+        ]
+    )
+
+
+def test_make_batches() -> None:
+    batches, ids = make_batches([1, 2, 3, object()], ["a", "b"], 3, "x")
+    assert ids == ["a..3", "x3"]
+    assert [case_id for case_id, _ in batches[0].cases] == ["a", "b", "3"]
+    with pytest.raises(ValueError):
+        make_batches([1], [], 0, "x")
+
+
+def test_daemon(pytester: Pytester) -> None:
+    builds = pytester.path / "builds.txt"
+    source = """
+        import os
+
+        from we_love_fixture import fixture
+
+
+        @fixture(scope="session", daemon=True)
+        def reference(size: int = 3):
+            with open("builds.txt", "a") as f:
+                f.write(f"{{os.getpid()}}\\n")
+            yield dict.fromkeys(range(size), {version!r})
+            with open("builds.txt", "a") as f:
+                f.write("teardown\\n")
+
+
+        def test_reference(reference):
+            assert isinstance(reference, dict) and len(reference) == 3
+            assert reference[1] == {version!r}
+            # a copy, the next run gets the daemon's value again
+            reference[1] = "changed"
+        """
+    pytester.makepyfile(source.format(version="v1"))
+    try:
+        for _ in range(2):
+            run(pytester, "--wlf-daemon").assert_outcomes(passed=1)
+        pids = builds.read_text().split()
+        assert len(pids) == 1 and pids[0] != str(os.getpid())
+
+        pytester.makepyfile(source.format(version="v2"))
+        run(pytester, "--wlf-daemon").assert_outcomes(passed=1)
+        assert builds.read_text().split()[1:] == ["teardown", pids[0]]
+    finally:
+        run(pytester, "--wlf-daemon-stop")
+
+    deadline = time.monotonic() + 5
+    while builds.read_text().split()[-1] != "teardown":
+        assert time.monotonic() < deadline, "daemon did not tear down"
+        time.sleep(0.05)
+
+
+def test_daemon_needs_session_scope() -> None:
+    from we_love_fixture import fixture
+
+    with pytest.raises(TypeError, match="scope='session'"):
+
+        @fixture(daemon=True)
+        def reference():
+            return {}
+
+    with pytest.raises(TypeError, match="requests tmp_path"):
+
+        @fixture(scope="session", daemon=True)
+        def other(tmp_path):
+            return {}
+
+
+def test_daemon_private_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    path = socket_path(tmp_path)
+    assert path.parent == tmp_path / "wlf"
+    assert path.parent.stat().st_mode & 0o777 == 0o700
+
+    key = path.with_suffix(".key")
+    key.write_bytes(b"key")
+    key.chmod(0o644)
+    with pytest.raises(RuntimeError, match="only accessible to the current user"):
+        DaemonClient(path).manager
+
+    path.parent.chmod(0o755)
+    with pytest.raises(RuntimeError, match="only accessible to the current user"):
+        socket_path(tmp_path)
+
+
+def test_dedupe(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        from we_love_fixture import fixture
+
+        builds = []
+
+        data = fixture(autoparam=True, scope="module", dedupe=True, a=[1], b=[2], c=[1])
+
+
+        @fixture(scope="module")
+        def expensive(data):
+            builds.append(list(data))
+            return sum(data)
+
+
+        def test_data(data, expensive):
+            assert expensive == sum(data)
+
+
+        def test_builds():
+            assert builds == [[1], [2]]
+        """
+    )
+    result = run(pytester, "-v")
+    result.assert_outcomes(passed=4)
+    result.stdout.fnmatch_lines(
+        [
+            "*test_data[[]a] PASSED*",
+            "*test_data[[]c] PASSED*",
+            "*test_data[[]b] PASSED*",
+        ]
+    )
+
+
+def test_dedupe_params() -> None:
+    one, other = {"x": [1]}, {"x": [1]}
+    params, ids = dedupe_params([one, 1, other, True, 1.0], ["one", "int", "other"])
+    assert params == [one, one, 1, True, 1.0]
+    assert params[1] is one
+    assert ids == ["one", "other", "int", None, None]
+
+    # containers are compared by their items, in any order for dicts and sets
+    params, _ = dedupe_params(
+        [{"a": 1, "b": {2}}, [(1,)], {"b": {2}, "a": 1}, [(1.0,)], [(1,)]], []
+    )
+    assert params[0] is params[1] and params[2] is params[3]
+    assert type(params[4][0][0]) is float
+
+
+def test_rows(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        from we_love_fixture import fixture
+
+        n = fixture(autoparam=True, params=range(3, 6))
+        point = fixture(autoparam=True, params={"x": range(2), "y": ["a", "b"]})
+
+
+        @fixture
+        def seen(point):
+            return point
+
+
+        def test_n(n):
+            assert n in (3, 4, 5)
+
+
+        def test_point(seen):
+            assert seen in ({"x": 0, "y": "a"}, {"x": 1, "y": "b"})
+        """
+    )
+    result = run(pytester, "-v")
+    result.assert_outcomes(passed=5)
+    result.stdout.fnmatch_lines(["*test_n?5? PASSED*", "*test_point?1-b? PASSED*"])
+
+
+def test_rows_ids() -> None:
+    rows = Rows({"x": range(3), "y": [0.5, 1.5, 2.5]})
+    assert len(rows) == 3
+    assert rows[1] == {"x": 1, "y": 1.5}
+    assert list(rows)[-1] == {"x": 2, "y": 2.5}
+    assert rows.ids() == ["0-0.5", "1-1.5", "2-2.5"]
+    assert rows.id(2) == "2-2.5"
+    assert Rows.of([1, 2]) is None
+
+    with pytest.raises(ValueError, match="same length"):
+        Rows({"x": range(3), "y": [1]})
+
+
+def test_rows_indirect(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        import pytest
+
+        from we_love_fixture import fixture
+
+        n = fixture(autoparam=True, params=range(100, 102))
+
+
+        def test_own(n):
+            assert n in (100, 101)
+
+
+        @pytest.mark.parametrize("n", [5, 0], indirect=True)
+        def test_indirect(n):
+            assert n in (5, 0)
+        """
+    )
+    run(pytester).assert_outcomes(passed=4)
+
+
+def test_rows_numpy(pytester: Pytester) -> None:
+    np = pytest.importorskip("numpy")
+    assert Rows(np.arange(3)).id(1) == "1"
+    assert Rows(np.arange(4).reshape(2, 2)).id(1) == "2-3"
+
+    pytester.makepyfile(
+        """
+        import numpy as np
+
+        from we_love_fixture import fixture
+
+        n = fixture(autoparam=True, params=np.arange(3))
+        pair = fixture(autoparam=True, params=np.arange(4).reshape(2, 2))
+
+
+        def test_n(n):
+            assert n in (0, 1, 2)
+
+
+        def test_pair(pair):
+            assert pair.tolist() in ([0, 1], [2, 3])
+        """
+    )
+    result = run(pytester, "-v")
+    result.assert_outcomes(passed=5)
+    result.stdout.fnmatch_lines(["*test_n?2? PASSED*", "*test_pair?2-3? PASSED*"])
+
+
+def test_parametrize_rows(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        from we_love_fixture.parametrize import parametrize
+
+
+        @parametrize(x=range(3))
+        def test_x(x):
+            assert x in (0, 1, 2)
+
+
+        @parametrize(point={"x": [1, 2], "y": ["a", "b"]})
+        def test_point(point):
+            assert point in ({"x": 1, "y": "a"}, {"x": 2, "y": "b"})
+        """
+    )
+    result = run(pytester, "-v")
+    result.assert_outcomes(passed=5)
+    result.stdout.fnmatch_lines(["*test_x?2? PASSED*", "*test_point?2-b? PASSED*"])
+
+
+def test_prefetch(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        import threading
+
+        import pytest
+
+        from we_love_fixture import fixture
+
+        events = []
+
+
+        @fixture(prefetch=2)
+        def schema(name: str = "public"):
+            events.append(("build", name, threading.current_thread().name))
+            yield name
+            events.append(("teardown", name))
+
+
+        def test_1(schema):
+            assert schema == "public"
+            assert ("build", "public", "MainThread") in events
+
+
+        @schema.mark(name="two")
+        def test_2(schema):
+            assert schema == "two"
+            (thread,) = [e[2] for e in events if e[:2] == ("build", "two")]
+            assert thread.startswith("wlf-prefetch")
+
+
+        @pytest.mark.skip
+        @schema.mark(name="skipped")
+        def test_3(schema):
+            pass
+
+
+        def test_4():
+            # cancelled if its build had not started yet, torn down otherwise
+            built = [e for e in events if e[:2] == ("build", "skipped")]
+            assert events.count(("teardown", "skipped")) == len(built)
+            assert events.count(("teardown", "public")) == 1
+            assert ("teardown", "two") in events
+        """
+    )
+    result = run(pytester, "--wlf-timing")
+    result.assert_outcomes(passed=3, skipped=1)
+    result.stdout.fnmatch_lines(["*::schema: 1 prefetch discarded, 1 prefetched"])
+
+
+def test_prefetch_validation() -> None:
+    from we_love_fixture import fixture
+
+    with pytest.raises(TypeError, match="scope='function'"):
+
+        @fixture(scope="module", prefetch=1)
+        def schema():
+            return {}
+
+    with pytest.raises(TypeError, match="requests tmp_path"):
+
+        @fixture(prefetch=1)
+        def seeded(tmp_path):
+            return tmp_path
+
+
+def test_optional(pytester: Pytester) -> None:
+    pytester.makepyfile(
+        """
+        import pytest
+
+        from we_love_fixture import fixture
+
+        calls = []
+
+
+        @pytest.fixture
+        def a():
+            calls.append("a")
+            return "a"
+
+
+        @pytest.fixture
+        def c():
+            calls.append("c")
+            return "c"
+
+
+        @fixture(optional=["c"])
+        def b(a, c, d: int = 1):
+            return a + c if d > 1 else a
+
+
+        def test_b(b):
+            assert b == "a"
+            assert calls == ["a"]
+
+
+        @b.mark(d=2)
+        def test_b2(b):
+            assert b == "ac"
+            assert calls == ["a", "a", "c"]
+        """
+    )
+    result = run(pytester, "--wlf-timing")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(["*::b: 1 optional resolved, 1 optional skipped"])
+
+
+def test_optional_must_be_a_fixture_argument() -> None:
+    from we_love_fixture import fixture
+
+    with pytest.raises(TypeError, match="optional='d'"):
+
+        @fixture(optional=["d"])
+        def b(a, d: int = 1):
+            return a
@@ -1,4 +1,5 @@
 """We Love Fixture."""
 from ._fixture import fixture
+from .baseline import FixtureBudgetWarning
 
-__all__ = ['fixture']
+__all__ = ['fixture', 'FixtureBudgetWarning']
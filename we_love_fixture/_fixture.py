@@ -2,15 +2,19 @@
 from __future__ import annotations
 
 import inspect
+from contextlib import nullcontext
 from dataclasses import dataclass, field
-from functools import wraps
+from functools import partial, wraps
 from inspect import Parameter, Signature, _empty, _ParameterKind, signature
+from time import perf_counter
 from optparse import Option
 from typing import (
     TYPE_CHECKING,
     Any,
     Callable,
     ClassVar,
+    ContextManager,
+    Counter,
     Dict,
     Generator,
     Iterable,
@@ -33,6 +37,16 @@ from makefun import create_function
 from pyparsing import Opt
 from xxlimited import foo
 
+from .baseline import check_budget
+from .batch import make_batches
+from .cache import cached_create_function
+from .daemon import get_daemon
+from .lazy import LazyProxy, is_built
+from .params import Rows, dedupe_params
+from .prefetch import get_prefetcher
+from .profiling import fixture_key, get_profiler
+from .snapshot import Snapshot
+
 T = TypeVar("T")
 FixtureFuncT = Callable[..., T]
 MarkerFuncT = Callable[..., T]
@@ -147,6 +161,47 @@ def _param_index(sig: Signature, name: str, ignore_self: bool = True) -> Optiona
     return i
 
 
+def _variant_key(request: SubRequest, mark_kwargs: Dict[str, object]) -> str:
+    """Identify the mark kwargs (and param) variant a fixture value is built for."""
+    parts = [f"{k}={v!r}" for k, v in sorted(mark_kwargs.items())]
+    if hasattr(request, "param"):
+        parts.insert(0, repr(request.param))
+    return ", ".join(parts)
+
+
+def _parametrized_by_test(request: SubRequest) -> bool:
+    """Whether the test parametrizes the fixture, e.g. with ``indirect=True``.
+
+    pytest then ignores the fixture's own params, see
+    ``FixtureManager.pytest_generate_tests``.
+    """
+    for mark in request._pyfuncitem.iter_markers("parametrize"):
+        argnames = mark.kwargs.get("argnames", mark.args[0] if mark.args else ())
+        if isinstance(argnames, str):
+            argnames = [name.strip() for name in argnames.split(",")]
+        if request.fixturename in argnames:
+            return True
+    return False
+
+
+def _requested_fixtures(sig: Signature, *ignore: str) -> List[str]:
+    """Names of the fixtures a fixture function requests from pytest."""
+    return [
+        p.name
+        for p in sig.parameters.values()
+        if p.name != "self" and p.name not in ignore and p.default is _empty
+    ]
+
+
+def _finish_generator(gen: Generator[Any, None, None], name: str) -> None:
+    try:
+        next(gen)
+    except StopIteration:
+        pass
+    else:
+        pytest.fail(f"fixture function {name!r} has more than one 'yield'")
+
+
 @dataclass
 class WeLoveFixture:
     """
@@ -176,10 +231,35 @@ class WeLoveFixture:
     args: Sequence[object] = field(default_factory=tuple, repr=False)
     kwargs: Dict[str, object] = field(default_factory=dict, repr=False)
 
+    # build the value once per mark kwargs variant and hand each test a fresh copy
+    snapshot: bool = field(default=False, repr=False)
+    # hand out a proxy and only run the fixture function when the value is used
+    lazy: bool = field(default=False, repr=False)
+    # run setup and teardown under cProfile and tracemalloc, see --wlf-profile
+    profile: bool = field(default=False, repr=False)
+    # warn or fail (--wlf-budget-action) when setup or teardown takes longer
+    budget_ms: Optional[float] = field(default=None, repr=False)
+    # autoparam only, run this many params inside one collected test item
+    batch: Optional[int] = field(default=None, repr=False)
+    # session fixtures only, keep the value alive in a daemon, see --wlf-daemon
+    daemon: bool = field(default=False, repr=False)
+    # intern equal params so wider scoped instances are built once per value
+    dedupe: bool = field(default=False, repr=False)
+    # fixtures requested through request.getfixturevalue only when first used
+    optional: Sequence[str] = field(default_factory=tuple, repr=False)
+    # function fixtures only, build the values of the next K tests in the background
+    prefetch: Optional[int] = field(default=None, repr=False)
+
     _fixture: Optional[_FixtureFunctionT] = field(default=None, repr=False)
     _pytestfixturefunction: Optional[FixtureFunctionMarker] = field(
         default=None, repr=False
     )
+    _function: Optional[_FixtureFunctionT] = field(default=None, repr=False)
+    _snapshots: Dict[str, Snapshot] = field(default_factory=dict, repr=False)
+    # params given as a range, array or columns, pytest only sees row numbers
+    _rows: Optional[Rows] = field(default=None, repr=False)
+    # counters shown in the timing report, e.g. lazy constructions avoided
+    _stats: Counter[str] = field(default_factory=Counter, repr=False)
 
     def __repr__(self) -> str:
         assert self._fixture, "no fixture is set, this is an error"
@@ -211,6 +291,8 @@ class WeLoveFixture:
 
         elif kwargs.pop("autoparam", False):
             # if the function is called as a autoparam
+            batch: Optional[int] = kwargs.pop("batch", None)
+            dedupe: bool = kwargs.pop("dedupe", False)
 
             calling_frame = inspect.stack()[1]
             assert calling_frame, "no frames?"
@@ -236,11 +318,17 @@ class WeLoveFixture:
                 signature(_func),
                 _func,
                 func_name=fixture_name,
+                # not _func's, fixtures are told apart by it, e.g. when profiling
+                qualname=fixture_name,
                 module_name=calling_module.__name__,
             )
 
-            return cls().pytest_fixture(fixture_function, *args, **kwargs)
+            return cls(batch=batch, dedupe=dedupe).pytest_fixture(
+                fixture_function, *args, **kwargs
+            )
         else:
+            if "batch" in kwargs:
+                raise TypeError("batch=N is only supported with autoparam=True")
             return cls(*args, **kwargs).pytest_fixture
 
     @classmethod
@@ -249,22 +337,27 @@ class WeLoveFixture:
         return cls.fixture(*args, **{**kwargs, "autoparam": True})
 
     @classmethod
-    def _mark_factory(cls, fixture_function: _FixtureFunctionT) -> Callable[..., Any]:
+    def _mark_factory(
+        cls,
+        fixture_function: _FixtureFunctionT,
+        fixture_sig: Optional[Signature] = None,
+    ) -> Callable[..., Any]:
         """generate mark method"""
         assert fixture_function
-        fixture_sig: Signature = signature(fixture_function)
+        fixture_sig = fixture_sig or signature(fixture_function)
 
         def _mark(**kwargs: Any) -> TestFuncT:
             _validate_input(mark_sig, **kwargs)
             return getattr(pytest.mark, fixture_function.__name__)(**kwargs)
 
-        mark_sig = signature(_mark)
         # mark_self = mark_sig.parameters["self"]
         mark_parameters = tuple(
             p for p in fixture_sig.parameters.values() if p.default is not _empty
         )
-        mark_sig = mark_sig.replace(parameters=mark_parameters)
-        mark: Callable[..., Any] = create_function(
+        mark_sig = Signature(
+            mark_parameters, return_annotation=_mark.__annotations__["return"]
+        )
+        mark: Callable[..., Any] = cached_create_function(
             mark_sig,
             _mark,
             func_name=f"{fixture_function.__name__}_mark",
@@ -272,19 +365,68 @@ class WeLoveFixture:
         )
         return mark
 
-    @classmethod
-    def _call_factory(cls, fixture_function: _FixtureFunctionT) -> Callable[..., Any]:
+    def _snapshot_value(self, key: str, build: Callable[[], Any]) -> Any:
+        if key in self._snapshots:
+            return self._snapshots[key].restore()
+        self._snapshots[key], value = Snapshot.take(build)
+        return value
+
+    @staticmethod
+    def _validate_standalone(
+        option: str,
+        fixture_function: _FixtureFunctionT,
+        fixture_sig: Signature,
+        scope: object,
+        needs_scope: str,
+    ) -> None:
+        """Check a fixture built without pytest's help, only from mark kwargs."""
+        name = fixture_function.__name__
+        if scope != needs_scope:
+            raise TypeError(
+                f"{option} needs scope={needs_scope!r}, {name!r} is {scope!r}"
+            )
+        needs = _requested_fixtures(fixture_sig)
+        if needs:
+            raise TypeError(
+                f"{option} fixtures are built outside of pytest and cannot "
+                f"request fixtures, {name!r} requests {', '.join(needs)}"
+            )
+
+    @staticmethod
+    def _validate_snapshot(
+        fixture_function: _FixtureFunctionT, fixture_sig: Signature
+    ) -> None:
+        name = fixture_function.__name__
+        if inspect.isgeneratorfunction(fixture_function):
+            raise TypeError(
+                f"snapshot=True needs a fixture that returns its value, "
+                f"{name!r} is a generator"
+            )
+        # snapshots are keyed by mark kwargs and param, not by dependency values
+        needs = _requested_fixtures(fixture_sig, "request")
+        if needs:
+            raise TypeError(
+                f"snapshot=True fixtures are built once per variant and cannot "
+                f"request fixtures, {name!r} requests {', '.join(needs)}"
+            )
+
+    def _call_factory(
+        self,
+        fixture_function: _FixtureFunctionT,
+        fixture_sig: Optional[Signature] = None,
+    ) -> Callable[..., Any]:
         """generate fixture callable"""
 
-        fixture_sig: Signature = signature(fixture_function)
+        fixture_sig = fixture_sig or signature(fixture_function)
         fixture_self_index = _param_index(fixture_sig, "self")
         fixture_request_index = _param_index(fixture_sig, "request")
+        is_generator = inspect.isgeneratorfunction(fixture_function)
 
         call_sig: Signature
         call_self_index: Optional[int]
         call_request_index: Optional[int]
 
-        def _the_thing(*args: Any, **kwargs: Any) -> Any:
+        def _the_thing(*args: Any, **kwargs: Any) -> Generator[Any, None, None]:
             # raise error if we have a signature mismatch
             print("the thing", args, kwargs)
             _validate_input(call_sig, *args, **kwargs)
@@ -295,6 +437,8 @@ class WeLoveFixture:
             # pluck the request out
             assert call_request_index is not None
             request = args_n_kwargs[call_request_index]
+            if self._rows is not None and not _parametrized_by_test(request):
+                request.param = self._rows[request.param]
 
             mark_kwargs = getattr(
                 request.node.get_closest_marker(fixture_function.__name__), "kwargs", {}
@@ -308,7 +452,74 @@ class WeLoveFixture:
             print(signature(fixture_function), args, kwargs, mark_kwargs)
             if "self" in fixture_sig.parameters:
                 kwargs["self"] = None
-            return fixture_function(**kwargs)
+
+            teardowns: List[Generator[Any, None, None]] = []
+
+            optional = {
+                name: LazyProxy(partial(request.getfixturevalue, name))
+                for name in self.optional
+            }
+            kwargs.update(optional)
+
+            daemon = get_daemon(request.config) if self.daemon else None
+            prefetcher = get_prefetcher(request.config) if self.prefetch else None
+            profiler = get_profiler(request.config)
+            if profiler and not profiler.wants(fixture_function, self.profile):
+                profiler = None
+
+            def profile(phase: str) -> ContextManager[None]:
+                if profiler is None:
+                    return nullcontext()
+                return profiler.profile(fixture_key(fixture_function), phase)
+
+            def setup() -> Any:
+                with profile("setup"):
+                    return build()
+
+            def build() -> Any:
+                if daemon is not None:
+                    return daemon.get(fixture_function, mark_kwargs)
+                if self.snapshot:
+                    return self._snapshot_value(
+                        _variant_key(request, mark_kwargs),
+                        lambda: fixture_function(**kwargs),
+                    )
+                prefetched = (
+                    prefetcher.take(request.node, request.fixturename)
+                    if prefetcher is not None
+                    else None
+                )
+                if prefetched is not None:
+                    value, gen = prefetched.result()
+                    if gen is not None:
+                        teardowns.append(gen)
+                    return value
+                if is_generator:
+                    gen = cast(Generator[Any, None, None], fixture_function(**kwargs))
+                    teardowns.append(gen)
+                    return next(gen)
+                return fixture_function(**kwargs)
+
+            if self.lazy:
+                proxy = LazyProxy(setup)
+                yield proxy
+                self._stats["lazy built" if is_built(proxy) else "lazy avoided"] += 1
+            else:
+                yield setup()
+
+            for proxy in optional.values():
+                stat = "optional resolved" if is_built(proxy) else "optional skipped"
+                self._stats[stat] += 1
+
+            if teardowns:
+                start = perf_counter()
+                with profile("teardown"):
+                    for gen in teardowns:
+                        _finish_generator(gen, fixture_function.__name__)
+                elapsed_ms = (perf_counter() - start) * 1000
+                check_budget(
+                    request.config, self, request.fixturename, "teardown", elapsed_ms
+                )
 
         # setup call func
         if fixture_self_index is None:
@@ -321,7 +532,7 @@ class WeLoveFixture:
                     **kwargs: Any,
                 ) -> Any:
                     print("no self, needs request", request, args, kwargs)
-                    return _the_thing(request, *args, **kwargs)
+                    yield from _the_thing(request, *args, **kwargs)
 
             else:
                 # no self, has request
@@ -331,7 +542,7 @@ class WeLoveFixture:
                     **kwargs: Any,
                 ) -> Any:
                     print("no self, has request", args, kwargs)
-                    return _the_thing(*args, **kwargs)
+                    yield from _the_thing(*args, **kwargs)
 
         else:
             # has self
@@ -345,7 +556,7 @@ class WeLoveFixture:
                     **kwargs: Any,
                 ) -> Any:
                     print("has self, needs request", locals())
-                    return _the_thing(
+                    yield from _the_thing(
                         # self,
                         request,
                         *args,
@@ -361,21 +572,29 @@ class WeLoveFixture:
                     **kwargs: Any,
                 ) -> Any:
                     print("has self, has request", locals())
-                    return _the_thing(
+                    yield from _the_thing(
                         # self,
                         *args,
                         **kwargs,
                     )
 
         # extract as variable for _validate_input closures above
-        call_sig = signature(wraps(fixture_function)(_call))
-        call_sig = _insert_param(call_sig, "request")
+        # same as signature(wraps(fixture_function)(_call)), without inspecting again
+        call_sig = _insert_param(fixture_sig, "request")
+        # pytest must not set optional dependencies up, _the_thing resolves them
+        for name in self.optional:
+            call_sig = _remove_param(call_sig, name)
         # call_sig = _insert_param(call_sig, "_wl_self", index=0)
         # call_sig = _remove_param(call_sig, "self")
         call_self_index = _param_index(call_sig, "self")
         call_request_index = _param_index(call_sig, "request")
 
-        call = create_function(call_sig, _call, func_name=fixture_function.__name__)
+        call = cached_create_function(
+            call_sig,
+            _call,
+            func_name=fixture_function.__name__,
+            cache_module=fixture_function.__module__,
+        )
 
         return call
 
@@ -386,24 +605,79 @@ class WeLoveFixture:
             return self
 
         # pop out all args
-        scope: _Scope = kwargs.pop("scope", "function")
-        autouse: bool = kwargs.pop("autouse", False)
-        params: Optional[List[str]] = list(kwargs.pop("params", []))
-        ids: Optional[List[str]] = list(kwargs.pop("ids", []))
+        scope: _Scope = kwargs.pop("scope", self.scope)
+        autouse: bool = kwargs.pop("autouse", self.autouse)
+        params_arg = kwargs.pop("params", self.params)
+        ids_arg = kwargs.pop("ids", self.ids)
+        # pytest calls a callable for every param, hand it over as is
+        id_function = ids_arg if callable(ids_arg) else None
+        ids: List[Any] = [] if id_function else list(ids_arg or [])
+        rows = Rows.of(params_arg)
+        if rows is not None:
+            if kwargs or args or self.dedupe or self.batch is not None:
+                # other params or regrouping need the row values themselves
+                ids = ids or rows.ids()
+                params_arg, rows = list(rows), None
+        params: List[Any] = [] if rows is not None else list(params_arg or [])
+
+        fixture_sig = signature(fixture_function)
+        if self.snapshot:
+            self._validate_snapshot(fixture_function, fixture_sig)
 
         # fill params with kwargs + args (in this order)
         params.extend(kwargs.values())
-        ids.extend(kwargs.keys())
+        if id_function is None:
+            ids.extend(kwargs.keys())
         params.extend(args)
 
-        call = self._call_factory(fixture_function)
-        call.mark = self._mark_factory(fixture_function)
+        if self.daemon:
+            self._validate_standalone(
+                "daemon=True", fixture_function, fixture_sig, scope, "session"
+            )
+        if self.prefetch is not None:
+            if self.prefetch < 1 or self.snapshot:
+                raise TypeError(
+                    f"prefetch needs a positive number of tests and no snapshot, "
+                    f"got prefetch={self.prefetch!r} on "
+                    f"{fixture_function.__name__!r}"
+                )
+            self._validate_standalone(
+                f"prefetch={self.prefetch}",
+                fixture_function,
+                fixture_sig,
+                scope,
+                "function",
+            )
+
+        for name in self.optional:
+            p = fixture_sig.parameters.get(name)
+            if p is None or p.default is not _empty or name in ("self", "request"):
+                raise TypeError(
+                    f"optional={name!r} must name a fixture argument of "
+                    f"{fixture_function.__name__!r}"
+                )
+
+        if self.dedupe:
+            params, ids = dedupe_params(params, ids)
+
+        if self.batch is not None:
+            params, ids = make_batches(
+                params, ids, self.batch, fixture_function.__name__
+            )
+
+        call = self._call_factory(fixture_function, fixture_sig)
+        call.mark = self._mark_factory(fixture_function, fixture_sig)
+        call._we_love_fixture = self
+        self._function = fixture_function
+        self._rows = rows
 
         self._fixture = pytest.fixture(
             scope=scope,
             autouse=autouse,
-            params=params or None,
-            ids=ids or None,
+            # row numbers as a range, not a list of a million ints
+            params=range(len(rows)) if rows is not None else params or None,
+            # row ids are formatted when pytest parametrizes a test with them
+            ids=ids or id_function or (rows.id if rows is not None else None),
         )(call)
 
         assert isinstance(self._fixture._pytestfixturefunction, FixtureFunctionMarker)
@@ -0,0 +1,122 @@
+"""Fixture latency budgets and regression checks against a stored baseline."""
+from __future__ import annotations
+
+import json
+import math
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Sequence
+
+import pytest
+from _pytest.config import Config
+
+from .graph import FixtureGraph
+
+if TYPE_CHECKING:
+    from ._fixture import WeLoveFixture
+
+PHASES = ("setup", "teardown")
+
+# differences below this many seconds are noise, not regressions
+NOISE_FLOOR = 0.001
+
+
+class FixtureBudgetWarning(UserWarning):
+    """A fixture took longer than its ``budget_ms`` or its recorded baseline."""
+
+
+def check_budget(
+    config: Config, wlf: WeLoveFixture, name: str, phase: str, elapsed_ms: float
+) -> None:
+    """Warn or fail (``--wlf-budget-action``) if a phase went over ``budget_ms``."""
+    if wlf.budget_ms is None or elapsed_ms <= wlf.budget_ms:
+        return
+    wlf._stats["over budget"] += 1
+    msg = (
+        f"fixture {name!r} {phase} took {elapsed_ms:.2f}ms, "
+        f"over its budget of {wlf.budget_ms}ms"
+    )
+    if config.getoption("wlf_budget_action") == "fail":
+        pytest.fail(msg, pytrace=False)
+    warnings.warn(FixtureBudgetWarning(msg))
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest rank percentile, ``q`` in 0..100."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    return {
+        "n": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+    }
+
+
+@dataclass
+class Regression:
+    fixture: str
+    phase: str
+    stat: str
+    baseline: float
+    current: float
+
+    def __str__(self) -> str:
+        ratio = self.current / self.baseline if self.baseline else math.inf
+        return (
+            f"{self.fixture} {self.phase} {self.stat} "
+            f"{self.baseline * 1000:.2f}ms -> {self.current * 1000:.2f}ms "
+            f"({ratio:.1f}x)"
+        )
+
+
+class Baseline:
+    """Setup and teardown p50/p95 per fixture, stored as JSON."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.fixtures: Dict[str, Dict[str, Dict[str, float]]] = {}
+        if path.exists():
+            self.fixtures = json.loads(path.read_text()).get("fixtures", {})
+
+    @staticmethod
+    def current(graph: FixtureGraph) -> Dict[str, Dict[str, Dict[str, float]]]:
+        return {
+            name: {
+                "setup": summarize(node.setups),
+                "teardown": summarize(node.teardowns),
+            }
+            for name, node in graph.fixtures.items()
+            if node.setups
+        }
+
+    def compare(self, graph: FixtureGraph, ratio: float) -> List[Regression]:
+        regressions = []
+        for name, phases in self.current(graph).items():
+            for phase in PHASES:
+                old = self.fixtures.get(name, {}).get(phase)
+                if not old or not phases[phase]["n"]:
+                    continue
+                for stat in ("p50", "p95"):
+                    current = phases[phase][stat]
+                    if (
+                        current > old[stat] * ratio
+                        and current - old[stat] > NOISE_FLOOR
+                    ):
+                        regressions.append(
+                            Regression(name, phase, stat, old[stat], current)
+                        )
+        return regressions
+
+    def update(self, graph: FixtureGraph) -> None:
+        """Merge the current run in, fixtures that did not run are kept."""
+        self.fixtures.update(self.current(graph))
+        self.path.write_text(
+            json.dumps({"fixtures": self.fixtures}, indent=2, sort_keys=True)
+        )
@@ -0,0 +1,117 @@
+"""Run many cheap autoparam cases inside a single collected test item."""
+from __future__ import annotations
+
+import itertools
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, List, Optional, Sequence, Set, Tuple
+
+from _pytest.fixtures import FixtureDef, SubRequest
+from _pytest.outcomes import Exit
+from _pytest.python import Function
+from _pytest.runner import CallInfo
+
+
+@dataclass(frozen=True)
+class Batch:
+    """The param of one batched item: ``cases`` are ``(id, value)`` pairs."""
+
+    id: str
+    cases: Tuple[Tuple[str, Any], ...]
+
+
+# names of the batch=N fixtures declared so far, fixture setups only look them
+# up when one of their argnames is among these
+BATCHED: Set[str] = set()
+
+
+def _case_id(value: Any, name: str, index: int) -> str:
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return str(value)
+    return f"{name}{index}"
+
+
+def make_batches(
+    params: Sequence[Any], ids: Sequence[str], size: int, name: str
+) -> Tuple[List[Batch], List[str]]:
+    """Group params (and their ids) into batches of ``size`` cases.
+
+    ``name`` is the fixture's and is added to ``BATCHED``.
+    """
+    if size < 1:
+        raise ValueError(f"batch must be a positive number of cases, got {size!r}")
+    BATCHED.add(name)
+
+    cases = [
+        (ids[i] if i < len(ids) else _case_id(value, name, i), value)
+        for i, value in enumerate(params)
+    ]
+    batches = []
+    for start in range(0, len(cases), size):
+        chunk = tuple(cases[start : start + size])
+        batch_id = chunk[0][0] if len(chunk) == 1 else f"{chunk[0][0]}..{chunk[-1][0]}"
+        batches.append(Batch(batch_id, chunk))
+    return batches, [batch.id for batch in batches]
+
+
+def batched_dependencies(fixturedef: FixtureDef[Any], request: SubRequest) -> List[str]:
+    """The batched fixtures ``fixturedef`` requests, only tests can take those."""
+    found: List[str] = []
+    if not BATCHED:
+        return found
+    for argname in fixturedef.argnames:
+        if argname not in BATCHED:
+            continue
+        fixturedefs = request._arg2fixturedefs.get(argname)
+        if argname == fixturedef.argname or not fixturedefs:
+            continue
+        wlf = getattr(fixturedefs[-1].func, "_we_love_fixture", None)
+        if wlf is not None and wlf.batch is not None:
+            found.append(argname)
+    return found
+
+
+def _case_nodeid(nodeid: str, case_ids: Sequence[Tuple[Batch, str]]) -> str:
+    base, bracket, params = nodeid.rpartition("[")
+    for batch, case_id in case_ids:
+        params = params.replace(batch.id, case_id, 1)
+    return f"{base}{bracket}{params}"
+
+
+def run_batch(pyfuncitem: Function) -> Optional[bool]:
+    """Call the test once per case of its batched params, reporting each case.
+
+    Returns None for items without batched params so pytest calls them as
+    usual.
+    """
+    funcargs = pyfuncitem.funcargs
+    # not isinstance, that would build lazy fixture values
+    batched = {k: v for k, v in funcargs.items() if type(v) is Batch}
+    if not batched:
+        return None
+
+    names = list(batched)
+    argnames = pyfuncitem._fixtureinfo.argnames
+    session = pyfuncitem.session
+
+    for combo in itertools.product(*(batched[name].cases for name in names)):
+        case_funcargs = {**funcargs, **{n: v for n, (_, v) in zip(names, combo)}}
+        testargs = {arg: case_funcargs[arg] for arg in argnames}
+        call = CallInfo.from_call(
+            partial(pyfuncitem.obj, **testargs),
+            when="call",
+            reraise=(Exit, KeyboardInterrupt),
+        )
+        # through the hook, so skipping, xfail and other plugins see every case
+        report = pyfuncitem.ihook.pytest_runtest_makereport(item=pyfuncitem, call=call)
+        report.nodeid = _case_nodeid(
+            pyfuncitem.nodeid,
+            [(batched[name], case_id) for name, (case_id, _) in zip(names, combo)],
+        )
+        pyfuncitem.ihook.pytest_runtest_logreport(report=report)
+        if session.shouldfail or session.shouldstop:
+            break
+
+    # set last, it marks the item's own report and not the cases'
+    pyfuncitem._wlf_batch = True  # type: ignore[attr-defined]
+    return True
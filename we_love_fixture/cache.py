@@ -0,0 +1,158 @@
+"""On disk cache of the wrapper functions ``@fixture`` generates, like ``.pyc``.
+
+makefun writes the source of every wrapper and compiles it, for thousands of
+fixtures that is a noticeable part of collection. The compiled code objects are
+kept per module in ``__pycache__`` and turned back into functions on later
+runs. A wrapper's code only depends on its name and parameter names and kinds,
+defaults and annotations are filled in from the live signature.
+"""
+from __future__ import annotations
+
+import atexit
+import builtins
+import hashlib
+import marshal
+import os
+import sys
+from inspect import Parameter, Signature, isgeneratorfunction
+from pathlib import Path
+from types import CodeType, FunctionType
+from typing import Any, Callable, Dict, Optional
+
+import makefun
+from makefun import create_function
+
+# bump when the layout of the cache file or the generated code changes
+CACHE_VERSION = 1
+
+
+def _cache_path(module_name: str) -> Optional[Path]:
+    module = sys.modules.get(module_name)
+    filename = getattr(module, "__file__", None)
+    if not filename:
+        return None
+    source = Path(filename)
+    tag = sys.implementation.cache_tag
+    return source.parent / "__pycache__" / f"{source.stem}.{tag}.wlf"
+
+
+class WrapperCache:
+    """Compiled wrapper code of one module, keyed by :func:`wrapper_key`."""
+
+    _modules: Dict[str, WrapperCache] = {}
+
+    def __init__(self, path: Optional[Path]) -> None:
+        self.path = path
+        self.code: Dict[str, CodeType] = {}
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        if path is not None and path.exists():
+            try:
+                self.code = marshal.loads(path.read_bytes())
+            except (OSError, ValueError, EOFError, TypeError):
+                self.code = {}
+
+    @classmethod
+    def for_module(cls, module_name: str) -> WrapperCache:
+        if module_name not in cls._modules:
+            cls._modules[module_name] = cls(_cache_path(module_name))
+        return cls._modules[module_name]
+
+    def get(self, key: str) -> Optional[CodeType]:
+        code = self.code.get(key)
+        if code is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return code
+
+    def put(self, key: str, code: CodeType) -> None:
+        self.code[key] = code
+        self._dirty = True
+
+    def flush(self) -> None:
+        if not self._dirty or self.path is None or sys.dont_write_bytecode:
+            return
+        try:
+            self.path.parent.mkdir(exist_ok=True)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_bytes(marshal.dumps(self.code))
+            os.replace(tmp, self.path)
+        except OSError:
+            return
+        self._dirty = False
+
+    @classmethod
+    def flush_all(cls) -> None:
+        for cache in cls._modules.values():
+            cache.flush()
+
+
+atexit.register(WrapperCache.flush_all)
+
+
+def wrapper_key(func_name: str, sig: Signature, generator: bool) -> str:
+    shape = [(p.name, int(p.kind)) for p in sig.parameters.values()]
+    data = repr((CACHE_VERSION, makefun.__version__, func_name, shape, generator))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _from_code(
+    code: CodeType,
+    sig: Signature,
+    impl: Callable[..., Any],
+    func_name: str,
+    module_name: Optional[str],
+) -> Callable[..., Any]:
+    # the same fields makefun.create_function fills in
+    func = FunctionType(
+        code, {"_func_impl_": impl, "__builtins__": builtins}, func_name
+    )
+    annotations: Dict[str, Any] = {}
+    defaults = []
+    kwdefaults: Dict[str, Any] = {}
+    for p in sig.parameters.values():
+        if p.annotation is not Parameter.empty:
+            annotations[p.name] = p.annotation
+        if p.default is Parameter.empty:
+            continue
+        if p.kind is Parameter.KEYWORD_ONLY:
+            kwdefaults[p.name] = p.default
+        else:
+            defaults.append(p.default)
+    if sig.return_annotation is not Signature.empty:
+        annotations["return"] = sig.return_annotation
+
+    func.__defaults__ = tuple(defaults) or None
+    func.__kwdefaults__ = kwdefaults or None
+    func.__annotations__ = annotations
+    func.__qualname__ = impl.__qualname__
+    func.__module__ = module_name or impl.__module__
+    func.__doc__ = impl.__doc__
+    return func
+
+
+def cached_create_function(
+    sig: Signature,
+    impl: Callable[..., Any],
+    func_name: str,
+    module_name: Optional[str] = None,
+    cache_module: Optional[str] = None,
+) -> Callable[..., Any]:
+    """``makefun.create_function`` that reuses code compiled on earlier runs.
+
+    ``cache_module`` is the module whose ``__pycache__`` holds the code, the
+    module the fixture is defined in.
+    """
+    cache = WrapperCache.for_module(cache_module or module_name or impl.__module__)
+    key = wrapper_key(func_name, sig, isgeneratorfunction(impl))
+    code = cache.get(key)
+    if code is not None:
+        return _from_code(code, sig, impl, func_name, module_name)
+
+    func: Callable[..., Any] = create_function(
+        sig, impl, func_name=func_name, module_name=module_name or impl.__module__
+    )
+    cache.put(key, func.__code__)
+    return func
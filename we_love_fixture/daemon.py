@@ -0,0 +1,310 @@
+"""Keep ``@fixture(scope="session", daemon=True)`` values alive across pytest runs.
+
+The daemon is a ``multiprocessing`` manager server listening on a Unix socket.
+It imports the fixture's module and builds the value once. Every run gets a
+copy of the value, unpickled from the daemon's. Values that cannot be pickled
+are handed out behind a ``multiprocessing`` proxy instead, which only forwards
+public methods and returns copies of their results. A fixture is torn down and
+rebuilt when its source file changes.
+
+Run ``python -m we_love_fixture.daemon SOCKET`` to serve, the plugin starts it
+on demand with ``--wlf-daemon``. The socket and its auth key live in a directory
+only the current user can access, see :func:`runtime_dir`.
+"""
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import importlib
+import inspect
+import os
+import pickle
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import AuthenticationError
+from multiprocessing.managers import BaseManager, Server
+from pathlib import Path
+from typing import Any, Callable, Dict, Generator, Iterator, List, Optional, Tuple
+
+from _pytest.config import Config
+
+DAEMON = "we-love-fixture-daemon"
+
+# a daemon that is not running, still starting or was started by another run
+_CONNECT_ERRORS = (OSError, EOFError, AuthenticationError)
+
+
+def _check_private(path: Path) -> None:
+    """Refuse ``path`` unless only the current user owns and can access it.
+
+    The daemon unpickles what it is sent and the client what it gets back, so
+    whoever can plant the socket or read the key can run code as this user.
+    """
+    st = path.lstat()
+    if stat.S_ISLNK(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise RuntimeError(
+            f"{path} must be owned by and only accessible to the current user, "
+            f"not serving or connecting to the fixture daemon through it"
+        )
+
+
+def runtime_dir() -> Path:
+    """The current user's private directory for daemon sockets and keys.
+
+    Under ``$XDG_RUNTIME_DIR`` if set, the temp directory otherwise.
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        path = Path(runtime) / "wlf"
+    else:
+        path = Path(tempfile.gettempdir()) / f"wlf-{os.getuid()}"
+    path.mkdir(mode=0o700, exist_ok=True)
+    _check_private(path)
+    return path
+
+
+def socket_path(rootdir: Path) -> Path:
+    """Unix socket of the daemon serving ``rootdir``, short enough for AF_UNIX."""
+    digest = hashlib.sha1(str(rootdir).encode()).hexdigest()[:12]  # noqa: S303
+    return runtime_dir() / f"{digest}.sock"
+
+
+def source_hash(func: Callable[..., Any]) -> str:
+    source = inspect.getsourcefile(func)
+    if source is None:
+        return ""
+    return hashlib.sha256(Path(source).read_bytes()).hexdigest()
+
+
+@dataclass
+class _Hosted:
+    source_hash: str
+    value: Any
+    teardown: Optional[Generator[Any, None, None]] = None
+    # the value pickled once, None if it cannot be pickled
+    pickled: Optional[bytes] = None
+
+    def finish(self) -> None:
+        if self.teardown is not None:
+            for _ in self.teardown:
+                pass
+
+
+class FixtureHost:
+    """Builds and keeps fixture values inside the daemon process."""
+
+    def __init__(self) -> None:
+        self.hosted: Dict[str, _Hosted] = {}
+        # source hash each module's code was last executed from
+        self.loaded: Dict[str, str] = {}
+        self.server: Optional[Server] = None
+        self._lock = threading.RLock()
+
+    def build(
+        self,
+        module_name: str,
+        qualname: str,
+        digest: str,
+        kwargs: Dict[str, Any],
+        path: List[str],
+    ) -> Tuple[str, Any]:
+        """Make sure the fixture is built for ``kwargs``.
+
+        Returns ``("value", pickled)`` for values that can be pickled and
+        ``("proxy", key)`` for everything else, the key is passed to :meth:`value`.
+        """
+        key = f"{module_name}:{qualname}:{sorted(kwargs.items())!r}"
+        with self._lock:
+            hosted = self.hosted.get(key)
+            if hosted is None or hosted.source_hash != digest:
+                if hosted is not None:
+                    hosted.finish()
+                self.hosted[key] = hosted = self._build(
+                    module_name, qualname, digest, kwargs, path
+                )
+            if hosted.pickled is None:
+                try:
+                    hosted.pickled = pickle.dumps(
+                        hosted.value, protocol=pickle.HIGHEST_PROTOCOL
+                    )
+                except Exception:
+                    return "proxy", key
+        return "value", hosted.pickled
+
+    def _build(
+        self,
+        module_name: str,
+        qualname: str,
+        digest: str,
+        kwargs: Dict[str, Any],
+        path: List[str],
+    ) -> _Hosted:
+        sys.path.extend(p for p in path if p not in sys.path)
+        module = importlib.import_module(module_name)
+        source = inspect.getsourcefile(module)
+        if source and self.loaded.get(module_name) != digest:
+            # not importlib.reload, its bytecode cache misses quick same size edits
+            code = compile(Path(source).read_bytes(), source, "exec")
+            exec(code, module.__dict__)  # noqa: S102
+            self.loaded[module_name] = digest
+
+        obj: Any = module
+        for part in qualname.split("."):
+            obj = getattr(obj, part)
+        function = obj._we_love_fixture._function
+        if "self" in inspect.signature(function).parameters:
+            kwargs = {**kwargs, "self": None}
+
+        if inspect.isgeneratorfunction(function):
+            gen = function(**kwargs)
+            return _Hosted(digest, next(gen), gen)
+        return _Hosted(digest, function(**kwargs))
+
+    def value(self, key: str) -> Any:
+        with self._lock:
+            return self.hosted[key].value
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for hosted in self.hosted.values():
+                hosted.finish()
+            self.hosted.clear()
+        if self.server is not None:
+            self.server.stop_event.set()  # type: ignore[attr-defined]
+
+
+HOST = FixtureHost()
+
+
+class DaemonManager(BaseManager):
+    pass
+
+
+DaemonManager.register("host", callable=lambda: HOST)
+DaemonManager.register("value", callable=lambda key: HOST.value(key))
+
+
+class DaemonClient:
+    """Connection to the fixture daemon, started on first use if needed."""
+
+    def __init__(self, path: Path, timeout: float = 10.0) -> None:
+        self.path = path
+        self.key_path = path.with_suffix(".key")
+        self.lock_path = path.with_suffix(".lock")
+        self.timeout = timeout
+        self._manager: Optional[DaemonManager] = None
+
+    def _connect(self) -> DaemonManager:
+        for path in (self.key_path, self.path):
+            _check_private(path)
+        manager = DaemonManager(
+            address=str(self.path), authkey=self.key_path.read_bytes()
+        )
+        manager.connect()
+        return manager
+
+    def _spawn(self) -> None:
+        for stale in (self.path, self.key_path):
+            if stale.exists():
+                stale.unlink()
+        fd = os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as key_file:
+            key_file.write(os.urandom(32))
+
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+        subprocess.Popen(  # noqa: S603
+            [sys.executable, "-m", "we_love_fixture.daemon", str(self.path)],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+    @contextmanager
+    def _spawn_lock(self) -> Iterator[None]:
+        """Only one process at a time may (re)start the daemon, e.g. xdist workers."""
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def _wait(self) -> DaemonManager:
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                return self._connect()
+            except _CONNECT_ERRORS:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    @property
+    def manager(self) -> DaemonManager:
+        if self._manager is not None:
+            return self._manager
+        try:
+            self._manager = self._connect()
+            return self._manager
+        except _CONNECT_ERRORS:
+            pass
+
+        with self._spawn_lock():
+            try:
+                # another process may have started it while we waited for the lock
+                self._manager = self._connect()
+            except _CONNECT_ERRORS:
+                self._spawn()
+                self._manager = self._wait()
+        return self._manager
+
+    def get(self, function: Callable[..., Any], kwargs: Dict[str, Any]) -> Any:
+        how, value = self.manager.host().build(  # type: ignore[attr-defined]
+            function.__module__,
+            function.__qualname__,
+            source_hash(function),
+            kwargs,
+            sys.path,
+        )
+        if how == "value":
+            return pickle.loads(value)  # noqa: S301
+        return self.manager.value(value)  # type: ignore[attr-defined]
+
+    def stop(self) -> None:
+        """Stop a running daemon, never starts one."""
+        try:
+            manager = self._manager or self._connect()
+            manager.host().shutdown()  # type: ignore[attr-defined]
+        except _CONNECT_ERRORS:
+            pass
+        self._manager = None
+
+
+def get_daemon(config: Config) -> Optional[DaemonClient]:
+    return config.pluginmanager.get_plugin(DAEMON)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    (path,) = argv if argv is not None else sys.argv[1:]
+    key_path = Path(path).with_suffix(".key")
+    _check_private(key_path)
+    # the socket, and so the daemon, is only reachable by the current user
+    os.umask(0o077)
+    manager = DaemonManager(address=path, authkey=key_path.read_bytes())
+    HOST.server = manager.get_server()
+    try:
+        HOST.server.serve_forever()
+    finally:
+        key_path.unlink()
+
+
+if __name__ == "__main__":
+    main()
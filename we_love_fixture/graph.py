@@ -0,0 +1,150 @@
+"""Fixture dependency graph recorded per test, with setup durations."""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+
+@dataclass
+class FixtureNode:
+    """A fixture as seen across the whole session."""
+
+    name: str
+    scope: str = "function"
+    we_love_fixture: bool = False
+    setups: List[float] = field(default_factory=list)
+    teardowns: List[float] = field(default_factory=list)
+
+    @property
+    def self_time(self) -> float:
+        return sum(self.setups)
+
+
+@dataclass
+class ItemGraph:
+    """The fixture DAG of a single test.
+
+    ``edges`` maps a fixture to the fixtures it depends on, ``durations`` holds
+    the self setup time of every fixture that was actually set up for this test
+    (fixtures served from a wider scope cache are in the DAG with 0 seconds).
+    """
+
+    nodeid: str
+    roots: List[str] = field(default_factory=list)
+    edges: Dict[str, Set[str]] = field(default_factory=dict)
+    durations: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, name: str, deps: Iterable[str] = ()) -> None:
+        self.edges.setdefault(name, set()).update(d for d in deps if d != name)
+        for dep in self.edges[name]:
+            self.edges.setdefault(dep, set())
+
+    def critical_path(self) -> Tuple[List[str], float]:
+        """Longest chain of setup time, from the test down to a leaf fixture."""
+        best: Dict[str, Tuple[List[str], float]] = {}
+
+        def visit(name: str, seen: Tuple[str, ...]) -> Tuple[List[str], float]:
+            if name in best:
+                return best[name]
+            path: List[str] = []
+            cost = 0.0
+            for dep in sorted(self.edges.get(name, ())):
+                if dep in seen:  # pragma: no cover - pytest rejects cycles
+                    continue
+                dep_path, dep_cost = visit(dep, seen + (name,))
+                if dep_cost > cost or not path:
+                    path, cost = dep_path, dep_cost
+            best[name] = ([name, *path], cost + self.durations.get(name, 0.0))
+            return best[name]
+
+        chains = [visit(root, ()) for root in self.roots or sorted(self.edges)]
+        return max(chains, key=lambda chain: chain[1], default=([], 0.0))
+
+
+@dataclass
+class FixtureGraph:
+    """All recorded tests plus per fixture aggregates."""
+
+    fixtures: Dict[str, FixtureNode] = field(default_factory=dict)
+    tests: Dict[str, ItemGraph] = field(default_factory=dict)
+
+    def fixture(self, name: str, **kwargs: Any) -> FixtureNode:
+        if name not in self.fixtures:
+            self.fixtures[name] = FixtureNode(name, **kwargs)
+        return self.fixtures[name]
+
+    def test(self, nodeid: str) -> ItemGraph:
+        if nodeid not in self.tests:
+            self.tests[nodeid] = ItemGraph(nodeid)
+        return self.tests[nodeid]
+
+    def record_setup(self, nodeid: str, name: str, duration: float) -> None:
+        self.fixture(name).setups.append(duration)
+        test = self.test(nodeid)
+        test.durations[name] = test.durations.get(name, 0.0) + duration
+
+    def self_times(self) -> Dict[str, float]:
+        """Total self setup time per fixture, slowest first."""
+        times = {name: node.self_time for name, node in self.fixtures.items()}
+        return dict(sorted(times.items(), key=lambda item: -item[1]))
+
+    def critical_paths(self) -> List[Tuple[str, List[str], float]]:
+        """The critical path of every test, slowest first."""
+        paths = [(nodeid, *test.critical_path()) for nodeid, test in self.tests.items()]
+        return sorted(paths, key=lambda item: -item[2])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fixtures": {
+                name: {
+                    "scope": node.scope,
+                    "we_love_fixture": node.we_love_fixture,
+                    "setups": len(node.setups),
+                    "self_time": node.self_time,
+                    "teardown_time": sum(node.teardowns),
+                }
+                for name, node in self.fixtures.items()
+            },
+            "tests": {
+                nodeid: {
+                    "roots": test.roots,
+                    "edges": {k: sorted(v) for k, v in test.edges.items()},
+                    "durations": test.durations,
+                    "critical_path": dict(
+                        zip(("path", "duration"), test.critical_path())
+                    ),
+                }
+                for nodeid, test in self.tests.items()
+            },
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_dot(self) -> str:
+        """Graphviz DOT of the union of all test DAGs.
+
+        Nodes are labeled with their total self setup time, edges on the
+        critical path of the slowest test are drawn bold.
+        """
+        critical: Set[Tuple[str, str]] = set()
+        paths = self.critical_paths()
+        if paths:
+            _, path, _ = paths[0]
+            critical = set(zip(path, path[1:]))
+
+        edges: Set[Tuple[str, str]] = set()
+        for test in self.tests.values():
+            edges.update((a, b) for a, deps in test.edges.items() for b in deps)
+
+        lines = ["digraph fixtures {", "  rankdir=LR;"]
+        for name, node in sorted(self.fixtures.items()):
+            shape = "box" if node.we_love_fixture else "ellipse"
+            label = f"{name}\\n{node.scope} {node.self_time * 1000:.1f}ms"
+            lines.append(f'  "{name}" [shape={shape}, label="{label}"];')
+        for a, b in sorted(edges):
+            style = " [style=bold, color=red]" if (a, b) in critical else ""
+            lines.append(f'  "{a}" -> "{b}"{style};')
+        lines.append("}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,151 @@
+"""Transparent proxies for fixture values that are only built when used."""
+from __future__ import annotations
+
+import operator
+import os
+from typing import Any, Callable
+
+_MISSING = object()
+
+
+def _forward(op: Callable[..., Any]) -> Callable[..., Any]:
+    def method(self: LazyProxy, *args: Any, **kwargs: Any) -> Any:
+        return op(self.__wrapped__, *args, **kwargs)
+
+    return method
+
+
+def _reflected(op: Callable[[Any, Any], Any]) -> Callable[..., Any]:
+    def method(self: LazyProxy, other: Any) -> Any:
+        return op(other, self.__wrapped__)
+
+    return method
+
+
+def _inplace(op: Callable[[Any, Any], Any]) -> Callable[..., Any]:
+    # mutates the value in place if it can, rebinds it otherwise, the name
+    # the operator is applied to stays bound to the proxy
+    def method(self: LazyProxy, other: Any) -> LazyProxy:
+        object.__setattr__(self, "_wlf_value", op(self.__wrapped__, other))
+        return self
+
+    return method
+
+
+class LazyProxy:
+    """Stands in for a fixture value and builds it on first real use.
+
+    Attribute access, calls, comparisons, operators, iteration, ``str``,
+    ``os.fspath`` and ``isinstance`` all build the value; ``repr`` of an unbuilt
+    proxy does not. In place operators update the value behind the proxy.
+    """
+
+    __slots__ = ("_wlf_factory", "_wlf_value", "__weakref__")
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        object.__setattr__(self, "_wlf_factory", factory)
+        object.__setattr__(self, "_wlf_value", _MISSING)
+
+    @property
+    def __wrapped__(self) -> Any:
+        value = object.__getattribute__(self, "_wlf_value")
+        if value is _MISSING:
+            value = object.__getattribute__(self, "_wlf_factory")()
+            object.__setattr__(self, "_wlf_value", value)
+        return value
+
+    @property  # type: ignore[misc]
+    def __class__(self) -> Any:
+        return type(self.__wrapped__)
+
+    def __repr__(self) -> str:
+        if not is_built(self):
+            factory = object.__getattribute__(self, "_wlf_factory")
+            return f"<{LazyProxy.__name__} of {factory!r}>"
+        return repr(self.__wrapped__)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__wrapped__, name)
+
+    __setattr__ = _forward(setattr)
+    __delattr__ = _forward(delattr)
+    __dir__ = _forward(dir)
+    __str__ = _forward(str)
+    __bytes__ = _forward(bytes)
+    __format__ = _forward(format)
+    __hash__ = _forward(hash)
+    __bool__ = _forward(bool)
+    __call__ = _forward(lambda value, *args, **kwargs: value(*args, **kwargs))
+    __len__ = _forward(len)
+    __iter__ = _forward(iter)
+    __next__ = _forward(next)
+    __length_hint__ = _forward(operator.length_hint)
+    __reversed__ = _forward(reversed)
+    __contains__ = _forward(operator.contains)
+    __getitem__ = _forward(operator.getitem)
+    __setitem__ = _forward(operator.setitem)
+    __delitem__ = _forward(operator.delitem)
+    __enter__ = _forward(lambda value: value.__enter__())
+    __exit__ = _forward(lambda value, *exc: value.__exit__(*exc))
+    __int__ = _forward(int)
+    __float__ = _forward(float)
+    __complex__ = _forward(complex)
+    __index__ = _forward(operator.index)
+    __round__ = _forward(round)
+    __fspath__ = _forward(os.fspath)
+
+    __eq__ = _forward(operator.eq)
+    __ne__ = _forward(operator.ne)
+    __lt__ = _forward(operator.lt)
+    __le__ = _forward(operator.le)
+    __gt__ = _forward(operator.gt)
+    __ge__ = _forward(operator.ge)
+
+    __neg__ = _forward(operator.neg)
+    __pos__ = _forward(operator.pos)
+    __abs__ = _forward(operator.abs)
+    __invert__ = _forward(operator.invert)
+    __add__ = _forward(operator.add)
+    __sub__ = _forward(operator.sub)
+    __mul__ = _forward(operator.mul)
+    __matmul__ = _forward(operator.matmul)
+    __truediv__ = _forward(operator.truediv)
+    __floordiv__ = _forward(operator.floordiv)
+    __mod__ = _forward(operator.mod)
+    __pow__ = _forward(operator.pow)
+    __lshift__ = _forward(operator.lshift)
+    __rshift__ = _forward(operator.rshift)
+    __and__ = _forward(operator.and_)
+    __or__ = _forward(operator.or_)
+    __xor__ = _forward(operator.xor)
+    __radd__ = _reflected(operator.add)
+    __rsub__ = _reflected(operator.sub)
+    __rmul__ = _reflected(operator.mul)
+    __rmatmul__ = _reflected(operator.matmul)
+    __rtruediv__ = _reflected(operator.truediv)
+    __rfloordiv__ = _reflected(operator.floordiv)
+    __rmod__ = _reflected(operator.mod)
+    __rpow__ = _reflected(operator.pow)
+    __rlshift__ = _reflected(operator.lshift)
+    __rrshift__ = _reflected(operator.rshift)
+    __rand__ = _reflected(operator.and_)
+    __ror__ = _reflected(operator.or_)
+    __rxor__ = _reflected(operator.xor)
+    __iadd__ = _inplace(operator.iadd)
+    __isub__ = _inplace(operator.isub)
+    __imul__ = _inplace(operator.imul)
+    __imatmul__ = _inplace(operator.imatmul)
+    __itruediv__ = _inplace(operator.itruediv)
+    __ifloordiv__ = _inplace(operator.ifloordiv)
+    __imod__ = _inplace(operator.imod)
+    __ipow__ = _inplace(operator.ipow)
+    __ilshift__ = _inplace(operator.ilshift)
+    __irshift__ = _inplace(operator.irshift)
+    __iand__ = _inplace(operator.iand)
+    __ior__ = _inplace(operator.ior)
+    __ixor__ = _inplace(operator.ixor)
+
+
+def is_built(proxy: LazyProxy) -> bool:
+    """Whether the value behind ``proxy`` has been built, without building it."""
+    return object.__getattribute__(proxy, "_wlf_value") is not _MISSING
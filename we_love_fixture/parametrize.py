@@ -9,14 +9,24 @@ from unittest import mock
 import pytest
 
 # Project Library
-from lindy.core.importlib import import_class
-from lindy.core.text import trim
+from .params import Rows
 
 
 def parametrize(**kwargs):
+    """Parametrize a test by keyword, one ``pytest.mark.parametrize`` per argument.
+
+    Ranges, arrays and dicts of columns are accepted like ``@fixture`` params,
+    but pytest is handed their row values, so every row is built here. Only
+    ``@fixture(autoparam=True, params=...)`` keeps them compact.
+    """
+
     def decorator_factory(func):
         for key, value in kwargs.items():
-            if isinstance(value, (list, tuple)):
+            rows = Rows.of(value)
+            if rows is not None:
+                # ranges, arrays and column dicts get their ids in one pass
+                func = pytest.mark.parametrize(key, rows, ids=rows.ids())(func)
+            elif isinstance(value, (list, tuple)):
                 func = pytest.mark.parametrize(key, value)(func)
             else:
                 func = pytest.mark.parametrize(key, [value])(func)
@@ -0,0 +1,128 @@
+"""Helpers for the params of parametrized fixtures."""
+from __future__ import annotations
+
+import pickle
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+
+def _structural_key(value: Any) -> Hashable:
+    """Equal for equal params, built from the items of dicts, sets and sequences.
+
+    Only opaque unhashable objects fall back to their pickle or repr.
+    """
+    if isinstance(value, dict):
+        items = [(_structural_key(k), _structural_key(v)) for k, v in value.items()]
+        # by repr, the keys of different types do not compare
+        return ("dict", type(value), tuple(sorted(items, key=repr)))
+    if isinstance(value, (set, frozenset)):
+        return ("set", type(value), frozenset(map(_structural_key, value)))
+    if isinstance(value, (list, tuple)):
+        return ("seq", type(value), tuple(map(_structural_key, value)))
+    try:
+        hash(value)
+    except TypeError:
+        pass
+    else:
+        # 1, 1.0 and True are equal, keep them apart
+        return ("hash", type(value), value)
+    try:
+        return ("pickle", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return ("repr", type(value), repr(value))
+
+
+def dedupe_params(
+    params: Sequence[Any], ids: Sequence[Optional[str]]
+) -> Tuple[List[Any], List[Optional[str]]]:
+    """Intern equal params and move them next to each other, keeping every id.
+
+    pytest reuses a higher scoped fixture instance when the next param ``is``
+    the cached one, so equal params become the same object and are ordered
+    together to get one setup per distinct value.
+    """
+    interned: Dict[Hashable, Any] = {}
+    groups: Dict[Hashable, List[Tuple[Any, Optional[str]]]] = {}
+    for i, value in enumerate(params):
+        key = _structural_key(value)
+        value = interned.setdefault(key, value)
+        groups.setdefault(key, []).append((value, ids[i] if i < len(ids) else None))
+
+    ordered = [case for group in groups.values() for case in group]
+    return [value for value, _ in ordered], [id_ for _, id_ in ordered]
+
+
+def _is_array(value: Any) -> bool:
+    # numpy arrays and look alikes, without importing numpy
+    return all(hasattr(value, attr) for attr in ("__array__", "shape", "astype"))
+
+
+def _column_ids(column: Any) -> List[str]:
+    if not _is_array(column):
+        return list(map(str, column))
+    if len(column.shape) > 1:
+        return list(map("-".join, column.astype(str).tolist()))
+    ids: List[str] = column.astype(str).tolist()
+    return ids
+
+
+class Rows(Sequence[Any]):
+    """Params kept as a range, an array or a dict of equal length columns.
+
+    A row is only built when it is indexed, ``@fixture`` hands pytest the row
+    numbers and looks the row up when a test sets the fixture up.
+    """
+
+    def __init__(self, data: Union[range, Dict[str, Any], Any]) -> None:
+        self.data = data
+        if isinstance(data, dict):
+            lengths = {name: len(column) for name, column in data.items()}
+            if len(set(lengths.values())) > 1:
+                raise ValueError(f"columns must have the same length, got {lengths}")
+            self.length = next(iter(lengths.values()), 0)
+        else:
+            self.length = len(data)
+
+    @classmethod
+    def of(cls, params: Any) -> Optional[Rows]:
+        """``params`` as rows if they are in a compact form, else None."""
+        if isinstance(params, (range, dict)) or _is_array(params):
+            return cls(params)
+        return None
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Any]:
+        return (self[i] for i in range(self.length))
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(self.data, dict):
+            return {name: column[index] for name, column in self.data.items()}
+        return self.data[index]
+
+    def id(self, index: int) -> str:
+        """The id of row ``index``, read from the columns without building the row."""
+        if isinstance(self.data, dict):
+            return "-".join(str(column[index]) for column in self.data.values())
+        value = self.data[index]
+        # numpy scalars look like arrays too, only rows of 2-D arrays are joined
+        if getattr(value, "ndim", 0) > 0:
+            return "-".join(map(str, value.tolist()))
+        return str(value)
+
+    def ids(self) -> List[str]:
+        """An id per row, formatted a column at a time."""
+        if isinstance(self.data, dict):
+            columns = [_column_ids(column) for column in self.data.values()]
+            return list(map("-".join, zip(*columns)))
+        return _column_ids(self.data)
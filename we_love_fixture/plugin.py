@@ -0,0 +1,333 @@
+"""pytest plugin for we_love_fixture, loaded through the ``pytest11`` entry point."""
+from __future__ import annotations
+
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Dict, Generator, List, Optional, Tuple
+
+import pytest
+from _pytest.config import Config, ExitCode
+from _pytest.config.argparsing import Parser
+from _pytest.fixtures import FixtureDef, SubRequest
+from _pytest.main import Session
+from _pytest.nodes import Item
+from _pytest.python import Function
+from _pytest.reports import TestReport
+from _pytest.runner import CallInfo
+from _pytest.terminal import TerminalReporter
+
+from .baseline import Baseline, Regression, check_budget
+from .batch import batched_dependencies, run_batch
+from .daemon import DAEMON, DaemonClient, socket_path
+from .graph import FixtureGraph
+from .prefetch import PREFETCHER, Prefetcher
+from .profiling import PROFILER, FixtureProfiler
+
+if TYPE_CHECKING:
+    from ._fixture import WeLoveFixture
+
+RECORDER = "we-love-fixture-recorder"
+
+
+def pytest_addoption(parser: Parser) -> None:
+    group = parser.getgroup("we-love-fixture")
+    group.addoption(
+        "--wlf-timing",
+        action="store_true",
+        default=False,
+        help="record fixture setup times and print a fixture timing report.",
+    )
+    group.addoption(
+        "--wlf-graph",
+        metavar="PATH",
+        default=None,
+        help="write the per test fixture dependency graph as JSON to PATH.",
+    )
+    group.addoption(
+        "--wlf-graph-dot",
+        metavar="PATH",
+        default=None,
+        help="write the fixture dependency graph as Graphviz DOT to PATH.",
+    )
+    group.addoption(
+        "--wlf-profile",
+        metavar="GLOB",
+        default=None,
+        help="profile setup and teardown of fixtures whose name matches GLOB.",
+    )
+    group.addoption(
+        "--wlf-profile-dir",
+        metavar="DIR",
+        default=".wlf-profile",
+        help="directory for fixture .pstats files and the allocation report.",
+    )
+    group.addoption(
+        "--wlf-baseline",
+        metavar="PATH",
+        default=None,
+        help="compare fixture setup/teardown p50/p95 against the baseline in PATH, "
+        "it is created if missing.",
+    )
+    group.addoption(
+        "--wlf-baseline-update",
+        action="store_true",
+        default=False,
+        help="write this run's fixture timings to the --wlf-baseline file.",
+    )
+    group.addoption(
+        "--wlf-regression-ratio",
+        metavar="RATIO",
+        type=float,
+        default=1.5,
+        help="a fixture regressed if a p50/p95 grew by more than RATIO (default 1.5).",
+    )
+    group.addoption(
+        "--wlf-budget-action",
+        choices=("warn", "fail"),
+        default="warn",
+        help="warn or fail when a fixture's setup or teardown exceeds its "
+        "budget_ms, or a fixture regressed.",
+    )
+    group.addoption(
+        "--wlf-daemon",
+        action="store_true",
+        default=False,
+        help="serve daemon=True session fixtures from a process that outlives "
+        "this run, it is started if it is not running yet. Each run gets a copy "
+        "of the value; values that cannot be pickled are proxied, only their "
+        "public methods work and those return copies.",
+    )
+    group.addoption(
+        "--wlf-daemon-stop",
+        action="store_true",
+        default=False,
+        help="tear down the daemon's fixtures and stop it at the end of the run.",
+    )
+
+
+def pytest_configure(config: Config) -> None:
+    if (
+        config.getoption("wlf_timing")
+        or config.getoption("wlf_graph")
+        or config.getoption("wlf_graph_dot")
+        or config.getoption("wlf_baseline")
+    ):
+        config.pluginmanager.register(FixtureRecorder(config), RECORDER)
+    # always there, fixtures can opt in with @fixture(profile=True)
+    config.pluginmanager.register(FixtureProfiler(config), PROFILER)
+    # idle unless a collected test uses a @fixture(prefetch=K)
+    config.pluginmanager.register(Prefetcher(), PREFETCHER)
+    if config.getoption("wlf_daemon"):
+        client = DaemonClient(socket_path(config.rootpath))
+        config.pluginmanager.register(client, DAEMON)
+
+
+def pytest_unconfigure(config: Config) -> None:
+    if config.getoption("wlf_daemon_stop"):
+        DaemonClient(socket_path(config.rootpath)).stop()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(
+    fixturedef: FixtureDef[Any], request: SubRequest
+) -> Generator[None, Any, None]:
+    batched = batched_dependencies(fixturedef, request)
+    if batched:
+        pytest.fail(
+            f"fixture {fixturedef.argname!r} requests "
+            f"{', '.join(map(repr, batched))}, batch=N fixtures can only be "
+            f"requested by tests",
+            pytrace=False,
+        )
+
+    wlf = getattr(fixturedef.func, "_we_love_fixture", None)
+    if wlf is None or wlf.budget_ms is None:
+        yield
+        return
+
+    # teardown is checked by the fixture itself, see WeLoveFixture._call_factory
+    start = perf_counter()
+    outcome = yield
+    elapsed_ms = (perf_counter() - start) * 1000
+    if outcome.excinfo is None:
+        check_budget(request.config, wlf, fixturedef.argname, "setup", elapsed_ms)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem: Function) -> Optional[bool]:
+    return run_batch(pyfuncitem)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(
+    item: Item, call: CallInfo[None]
+) -> Generator[None, Any, None]:
+    outcome = yield
+    if call.when == "call" and getattr(item, "_wlf_batch", False):
+        outcome.get_result().wlf_batch = True
+
+
+def pytest_report_teststatus(report: TestReport) -> Optional[Tuple[str, str, str]]:
+    # every case of a batch is reported on its own, hide the item that ran them
+    if getattr(report, "wlf_batch", False) and report.passed:
+        return "", "", ""
+    return None
+
+
+def is_we_love_fixture(fixturedef: FixtureDef[Any]) -> bool:
+    return getattr(fixturedef.func, "_we_love_fixture", None) is not None
+
+
+def get_recorder(config: Config) -> Optional[FixtureRecorder]:
+    return config.pluginmanager.get_plugin(RECORDER)
+
+
+def we_love_fixtures(session: Optional[Session]) -> Dict[str, WeLoveFixture]:
+    """Every we_love_fixture fixture pytest knows about in this session."""
+    found: Dict[str, WeLoveFixture] = {}
+    if session is None:
+        return found
+    for name, fixturedefs in session._fixturemanager._arg2fixturedefs.items():
+        for fixturedef in fixturedefs:
+            wlf = getattr(fixturedef.func, "_we_love_fixture", None)
+            if wlf is not None:
+                found[f"{fixturedef.baseid}::{name}".lstrip(":")] = wlf
+    return found
+
+
+def pytest_terminal_summary(terminalreporter: TerminalReporter) -> None:
+    tr = terminalreporter
+    snapshots = [
+        (name, key, snapshot)
+        for name, wlf in we_love_fixtures(tr._session).items()
+        for key, snapshot in wlf._snapshots.items()
+    ]
+    if not snapshots:
+        return
+    tr.write_sep("=", "we love fixture snapshots")
+    for name, key, snapshot in snapshots:
+        tr.write_line(
+            f"{name}[{key}]: built in {snapshot.build_time * 1000:.2f}ms, "
+            f"{snapshot.restores}x {snapshot.method} restore "
+            f"{snapshot.speedup:.1f}x faster than a rebuild, "
+            f"saved {snapshot.saved * 1000:.2f}ms"
+        )
+
+
+class FixtureRecorder:
+    """Records the fixture DAG of every test together with setup and teardown
+    durations."""
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.graph = FixtureGraph()
+        self.regressions: List[Regression] = []
+        # [fixture name, time spent in nested setups] for setups in flight
+        self._stack: List[List[Any]] = []
+        self._teardowns: Dict[FixtureDef[Any], float] = {}
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_fixture_setup(
+        self, fixturedef: FixtureDef[Any], request: SubRequest
+    ) -> Generator[None, None, None]:
+        name = fixturedef.argname
+        nodeid = request._pyfuncitem.nodeid
+        node = self.graph.fixture(
+            name,
+            scope=fixturedef.scope,
+            we_love_fixture=is_we_love_fixture(fixturedef),
+        )
+        test = self.graph.test(nodeid)
+        test.add(name, (a for a in fixturedef.argnames if a != "request"))
+        if self._stack:
+            # requested dynamically, e.g. through request.getfixturevalue
+            test.add(self._stack[-1][0], (name,))
+
+        self._stack.append([name, 0.0])
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            duration = perf_counter() - start
+            _, nested = self._stack.pop()
+            if self._stack:
+                self._stack[-1][1] += duration
+            node.scope = fixturedef.scope
+            self.graph.record_setup(nodeid, name, max(duration - nested, 0.0))
+            # finalizers run last in first out, so this one runs before the
+            # fixture's own teardown and after the teardown of its dependents
+            fixturedef.addfinalizer(partial(self._teardown_started, fixturedef))
+
+    def _teardown_started(self, fixturedef: FixtureDef[Any]) -> None:
+        self._teardowns[fixturedef] = perf_counter()
+
+    def pytest_fixture_post_finalizer(self, fixturedef: FixtureDef[Any]) -> None:
+        start = self._teardowns.pop(fixturedef, None)
+        if start is not None:
+            node = self.graph.fixture(fixturedef.argname)
+            node.teardowns.append(perf_counter() - start)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_setup(self, item: Item) -> Generator[None, None, None]:
+        yield
+        fixtureinfo = getattr(item, "_fixtureinfo", None)
+        if fixtureinfo is None:
+            return
+        test = self.graph.test(item.nodeid)
+        test.roots = [a for a in fixtureinfo.argnames if a != "request"]
+        for name in getattr(item, "fixturenames", ()):
+            fixturedefs = fixtureinfo.name2fixturedefs.get(name)
+            if not fixturedefs:
+                continue
+            fixturedef = fixturedefs[-1]
+            self.graph.fixture(
+                name,
+                scope=fixturedef.scope,
+                we_love_fixture=is_we_love_fixture(fixturedef),
+            )
+            test.add(name, (a for a in fixturedef.argnames if a != "request"))
+
+    def pytest_sessionfinish(self, session: Session) -> None:
+        baseline_path = self.config.getoption("wlf_baseline")
+        if baseline_path:
+            baseline = Baseline(Path(baseline_path))
+            ratio = self.config.getoption("wlf_regression_ratio")
+            self.regressions = baseline.compare(self.graph, ratio)
+            if self.config.getoption("wlf_baseline_update") or not baseline.fixtures:
+                baseline.update(self.graph)
+            elif (
+                self.regressions
+                and self.config.getoption("wlf_budget_action") == "fail"
+                and session.exitstatus == ExitCode.OK
+            ):
+                session.exitstatus = ExitCode.TESTS_FAILED
+
+        json_path = self.config.getoption("wlf_graph")
+        if json_path:
+            Path(json_path).write_text(self.graph.to_json())
+        dot_path = self.config.getoption("wlf_graph_dot")
+        if dot_path:
+            Path(dot_path).write_text(self.graph.to_dot())
+
+    def pytest_terminal_summary(self, terminalreporter: TerminalReporter) -> None:
+        tr = terminalreporter
+        tr.write_sep("=", "we love fixture timing")
+        for name, self_time in list(self.graph.self_times().items())[:10]:
+            node = self.graph.fixtures[name]
+            tr.write_line(
+                f"{self_time * 1000:10.2f}ms {len(node.setups):6d}x  {name} ({node.scope})"
+            )
+        paths = self.graph.critical_paths()
+        if paths:
+            nodeid, path, duration = paths[0]
+            tr.write_line(
+                f"critical path {duration * 1000:.2f}ms in {nodeid}: "
+                + " -> ".join(path)
+            )
+        for regression in self.regressions:
+            tr.write_line(f"REGRESSION {regression}", red=True)
+        for name, wlf in we_love_fixtures(tr._session).items():
+            if wlf._stats:
+                counts = sorted(wlf._stats.items())
+                tr.write_line(f"{name}: " + ", ".join(f"{n} {k}" for k, n in counts))
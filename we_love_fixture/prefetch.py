@@ -0,0 +1,163 @@
+"""Build ``@fixture(prefetch=K)`` values for upcoming tests in the background.
+
+While a test runs, the values of its K successors are built in a thread pool
+from their mark kwargs and handed over when those tests set up. Values a test
+did not take, e.g. because it was skipped, are torn down after it ran.
+"""
+from __future__ import annotations
+
+import inspect
+import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    List,
+    Optional,
+    Tuple,
+)
+
+import pytest
+from _pytest.config import Config
+from _pytest.main import Session
+from _pytest.nodes import Item
+
+if TYPE_CHECKING:
+    from ._fixture import WeLoveFixture
+
+PREFETCHER = "we-love-fixture-prefetcher"
+
+# the fixture value and, for generator fixtures, the generator to finish
+Built = Tuple[Any, Optional[Generator[Any, None, None]]]
+
+
+def _build(function: Callable[..., Any], kwargs: Dict[str, Any]) -> Built:
+    if "self" in inspect.signature(function).parameters:
+        kwargs = {**kwargs, "self": None}
+    if inspect.isgeneratorfunction(function):
+        gen = function(**kwargs)
+        return next(gen), gen
+    return function(**kwargs), None
+
+
+def _prefetched(item: Item) -> List[Tuple[str, WeLoveFixture, int]]:
+    """The prefetch fixtures ``item`` uses, by argname, with their lookahead."""
+    info = getattr(item, "_fixtureinfo", None)
+    if info is None:
+        return []
+    found = []
+    for argname in info.names_closure:
+        fixturedefs = info.name2fixturedefs.get(argname)
+        if not fixturedefs:
+            continue
+        wlf = getattr(fixturedefs[-1].func, "_we_love_fixture", None)
+        if wlf is not None and wlf.prefetch:
+            found.append((argname, wlf, wlf.prefetch))
+    return found
+
+
+class Prefetcher:
+    """Looks ahead in the collected items and builds their values early.
+
+    The lookahead follows the collection order, tests run in another order
+    (e.g. by pytest-xdist) only waste their prefetched values.
+    """
+
+    def __init__(self) -> None:
+        self.items: List[Item] = []
+        self.index: Dict[str, int] = {}
+        self.plan: Dict[str, List[Tuple[str, WeLoveFixture, int]]] = {}
+        self.futures: Dict[Tuple[str, str], Tuple[WeLoveFixture, Future[Built]]] = {}
+        self.lookahead = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.lookahead, thread_name_prefix="wlf-prefetch"
+            )
+        return self._executor
+
+    def pytest_collection_finish(self, session: Session) -> None:
+        self.items = list(session.items)
+        self.index = {item.nodeid: i for i, item in enumerate(self.items)}
+        for item in self.items:
+            fixtures = _prefetched(item)
+            if fixtures:
+                self.plan[item.nodeid] = fixtures
+        self.lookahead = max(
+            (depth for fixtures in self.plan.values() for _, _, depth in fixtures),
+            default=0,
+        )
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item: Item) -> Generator[None, None, None]:
+        if self.plan:
+            self._schedule(item)
+        yield
+        self._discard(item.nodeid)
+
+    def _schedule(self, item: Item) -> None:
+        start = self.index.get(item.nodeid)
+        if start is None:
+            return
+        upcoming = self.items[start + 1 : start + 1 + self.lookahead]
+        for ahead, other in enumerate(upcoming, start=1):
+            for argname, wlf, depth in self.plan.get(other.nodeid, ()):
+                key = (other.nodeid, argname)
+                if ahead > depth or key in self.futures:
+                    continue
+                function = wlf._function
+                assert function is not None
+                marker = other.get_closest_marker(function.__name__)
+                kwargs = dict(getattr(marker, "kwargs", {}))
+                future = self.executor.submit(_build, function, kwargs)
+                self.futures[key] = (wlf, future)
+
+    def take(self, item: Item, argname: str) -> Optional[Future[Built]]:
+        """The value prefetched for ``item``, None if there is none."""
+        entry = self.futures.pop((item.nodeid, argname), None)
+        if entry is None:
+            return None
+        wlf, future = entry
+        wlf._stats["prefetched"] += 1
+        return future
+
+    def _discard(self, nodeid: Optional[str] = None) -> None:
+        keys = [key for key in self.futures if nodeid is None or key[0] == nodeid]
+        for key in keys:
+            wlf, future = self.futures.pop(key)
+            wlf._stats["prefetch discarded"] += 1
+            if future.cancel():
+                continue
+            try:
+                _, gen = future.result()
+            except Exception:
+                # no test asked for the value, nobody to report the error to
+                continue
+            if gen is None:
+                continue
+            try:
+                for _ in gen:
+                    pass
+            except Exception as e:
+                warnings.warn(
+                    pytest.PytestWarning(
+                        f"teardown of {key[1]!r} prefetched for {key[0]} "
+                        f"failed: {e!r}"
+                    )
+                )
+
+    def pytest_sessionfinish(self) -> None:
+        self._discard()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def get_prefetcher(config: Config) -> Optional[Prefetcher]:
+    return config.pluginmanager.get_plugin(PREFETCHER)
@@ -0,0 +1,186 @@
+"""cProfile and tracemalloc instrumentation of fixture setup and teardown."""
+from __future__ import annotations
+
+import cProfile
+import contextlib
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Any, Callable, Counter, Dict, Generator, List, Optional, Tuple
+
+from _pytest.config import Config
+from _pytest.terminal import TerminalReporter
+
+PROFILER = "we-love-fixture-profiler"
+
+# keep the profilers' own bookkeeping out of the allocation reports
+_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    tracemalloc.Filter(False, pstats.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    # the profile() context managers wrapping each phase
+    tracemalloc.Filter(False, contextlib.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+def fixture_key(fixture_function: Callable[..., Any]) -> str:
+    return f"{fixture_function.__module__}.{fixture_function.__qualname__}"
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_FILTERS)
+
+
+@dataclass
+class FixtureProfile:
+    """Stats of one fixture aggregated over all of its instances."""
+
+    key: str
+    instances: int = 0
+    stats: Optional[pstats.Stats] = field(default=None, repr=False)
+    # bytes allocated per source line, per phase
+    allocated: Dict[str, Counter[str]] = field(default_factory=dict, repr=False)
+    # net bytes per source line over this fixture's setups and teardowns, from
+    # the second instance on so one-off initialisation is not taken for a leak
+    net: Counter[str] = field(default_factory=Counter, repr=False)
+    # memory at the start of the second and the latest setup, for leak detection
+    first: Optional[tracemalloc.Snapshot] = field(default=None, repr=False)
+    latest: Optional[tracemalloc.Snapshot] = field(default=None, repr=False)
+
+    def add(self, profile: cProfile.Profile) -> None:
+        if self.stats is None:
+            self.stats = pstats.Stats(profile)
+        else:
+            self.stats.add(profile)
+
+    def allocate(
+        self, phase: str, before: tracemalloc.Snapshot, after: tracemalloc.Snapshot
+    ) -> None:
+        counter = self.allocated.setdefault(phase, Counter())
+        for diff in after.compare_to(before, "lineno"):
+            line = str(diff.traceback)
+            if self.instances > 1:
+                self.net[line] += diff.size_diff
+            if diff.size_diff > 0:
+                counter[line] += diff.size_diff
+
+    def retained(self) -> List[Tuple[str, int]]:
+        """Lines this fixture kept allocating on and never freed, per instance.
+
+        Only growth inside the fixture's own setups and teardowns after its
+        first instance counts, capped by the growth of the whole process between
+        the second and latest setup so memory freed later on is not reported.
+        """
+        if self.first is None or self.latest is None or self.instances < 3:
+            return []
+        grown = {
+            str(diff.traceback): diff.size_diff
+            for diff in self.latest.compare_to(self.first, "lineno")
+        }
+        retained = []
+        for line, size in self.net.items():
+            size = min(size, grown.get(line, 0))
+            if size > 0:
+                retained.append((line, size))
+        return retained
+
+
+class FixtureProfiler:
+    """Runs selected fixture setups and teardowns under cProfile and tracemalloc.
+
+    A fixture is profiled if it was declared with ``profile=True`` or its name
+    matches the ``--wlf-profile`` glob. Profiles are aggregated per fixture and
+    written to ``--wlf-profile-dir`` at the end of the session.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.pattern: Optional[str] = config.getoption("wlf_profile")
+        self.directory = Path(config.getoption("wlf_profile_dir"))
+        self.profiles: Dict[str, FixtureProfile] = {}
+        self._active = False
+        self._started_tracemalloc = False
+
+    def wants(self, fixture_function: Callable[..., Any], flag: bool) -> bool:
+        if flag:
+            return True
+        if not self.pattern:
+            return False
+        return fnmatchcase(fixture_function.__name__, self.pattern) or fnmatchcase(
+            fixture_key(fixture_function), self.pattern
+        )
+
+    @contextmanager
+    def profile(self, key: str, phase: str) -> Generator[None, None, None]:
+        if self._active:
+            # a nested fixture setup, it is accounted to the outer profile
+            yield
+            return
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        fixture = self.profiles.setdefault(key, FixtureProfile(key))
+        before = _snapshot()
+        if phase == "setup":
+            fixture.instances += 1
+            if fixture.instances == 2:
+                fixture.first = before
+            fixture.latest = before
+
+        profile = cProfile.Profile()
+        self._active = True
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._active = False
+            fixture.add(profile)
+            fixture.allocate(phase, before, _snapshot())
+
+    def pytest_sessionfinish(self) -> None:
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        if not self.profiles:
+            return
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for key, fixture in self.profiles.items():
+            if fixture.stats is not None:
+                fixture.stats.dump_stats(str(self.directory / f"{key}.pstats"))
+        (self.directory / "allocations.txt").write_text("\n".join(self.report(20)))
+
+    def report(self, top: int) -> List[str]:
+        lines = []
+        for key, fixture in sorted(self.profiles.items()):
+            # set by pstats.Stats but missing from its stubs
+            total: float = getattr(fixture.stats, "total_tt", 0.0)
+            lines.append(f"{key}: {fixture.instances}x, {total * 1000:.2f}ms")
+            for phase, counter in sorted(fixture.allocated.items()):
+                for line, size in counter.most_common(top):
+                    lines.append(f"  {phase} {size / 1024:10.1f} KiB  {line}")
+            retained = sorted(fixture.retained(), key=lambda item: -item[1])
+            for line, size in retained[:top]:
+                lines.append(f"  retained {size / 1024:7.1f} KiB  {line}")
+        return lines
+
+    def pytest_terminal_summary(self, terminalreporter: TerminalReporter) -> None:
+        if not self.profiles:
+            return
+        terminalreporter.write_sep("=", "we love fixture profiles")
+        for line in self.report(3):
+            terminalreporter.write_line(line)
+        terminalreporter.write_line(
+            f"pstats and allocations written to {self.directory}"
+        )
+
+
+def get_profiler(config: Config) -> Optional[FixtureProfiler]:
+    return config.pluginmanager.get_plugin(PROFILER)
@@ -0,0 +1,75 @@
+"""Snapshots of expensive mutable fixture values, restored fresh for every test."""
+from __future__ import annotations
+
+import copy
+import pickle
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any, Callable, Optional, Tuple
+
+
+@dataclass
+class Snapshot:
+    """A built fixture value kept as pickle bytes or as a master for deepcopy.
+
+    Both restore methods are timed once when the snapshot is taken and the
+    faster one is used from then on.
+    """
+
+    build_time: float
+    method: str = "deepcopy"
+    restores: int = 0
+    restore_time: float = 0.0
+    _value: Any = field(default=None, repr=False)
+    _data: Optional[bytes] = field(default=None, repr=False)
+
+    @classmethod
+    def take(cls, build: Callable[[], Any]) -> Tuple[Snapshot, Any]:
+        """Build the value, snapshot it and return the snapshot with a fresh copy."""
+        start = perf_counter()
+        value = build()
+        snapshot = cls(build_time=perf_counter() - start, _value=value)
+        return snapshot, snapshot._choose_method()
+
+    def _choose_method(self) -> Any:
+        start = perf_counter()
+        copied = copy.deepcopy(self._value)
+        deepcopy_time = perf_counter() - start
+
+        try:
+            data = pickle.dumps(self._value, protocol=pickle.HIGHEST_PROTOCOL)
+            start = perf_counter()
+            unpickled = pickle.loads(data)  # noqa: S301 - our own bytes
+            pickle_time = perf_counter() - start
+        except Exception:
+            return self._restored(copied, deepcopy_time)
+
+        if pickle_time < deepcopy_time:
+            self.method, self._data, self._value = "pickle", data, None
+            return self._restored(unpickled, pickle_time)
+        return self._restored(copied, deepcopy_time)
+
+    def _restored(self, value: Any, duration: float) -> Any:
+        self.restores += 1
+        self.restore_time += duration
+        return value
+
+    def restore(self) -> Any:
+        """A fresh copy of the snapshotted value."""
+        start = perf_counter()
+        if self._data is not None:
+            value = pickle.loads(self._data)  # noqa: S301 - our own bytes
+        else:
+            value = copy.deepcopy(self._value)
+        return self._restored(value, perf_counter() - start)
+
+    @property
+    def speedup(self) -> float:
+        """How many times faster a restore is than building the value again."""
+        mean = self.restore_time / self.restores if self.restores else 0.0
+        return self.build_time / mean if mean else float("inf")
+
+    @property
+    def saved(self) -> float:
+        """Seconds saved by restoring instead of rebuilding for every test."""
+        return self.build_time * (self.restores - 1) - self.restore_time